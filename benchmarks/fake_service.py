@@ -0,0 +1,247 @@
+import copy
+import itertools
+import json
+import random
+import threading
+import time
+
+import botocore.session
+from botocore import xform_name
+from botocore.exceptions import ClientError, ParamValidationError
+
+STANDARD_LENS_ALIAS = 'wellarchitected'
+OPERATIONS = ['list_workloads', 'list_lenses', 'list_answers', 'get_answer', 'update_answer', 'create_workload',
+              'get_workload', 'associate_lenses', 'import_lens', 'create_lens_version', 'export_lens', 'get_lens_review',
+              'list_lens_review_improvements']
+SERVICE_MODEL = botocore.session.get_session().get_service_model('wellarchitected')
+API_NAMES = {xform_name(name): name for name in SERVICE_MODEL.operation_names}
+INPUT_SHAPES = {xform_name(name): SERVICE_MODEL.operation_model(name).input_shape for name in SERVICE_MODEL.operation_names}
+
+
+class FakeMeta:
+
+    def __init__(self, region_name):
+        self.region_name = region_name
+        self.service_model = SERVICE_MODEL
+        self.method_to_api_mapping = {operation: API_NAMES[operation] for operation in OPERATIONS}
+
+
+class FakeWellArchitected:
+
+    def __init__(self, standard_catalog, latency=0.0, throttle_rate=0.0, page_size=50, region_name='eu-central-1', seed=0):
+        self.meta = FakeMeta(region_name)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = dict.fromkeys(OPERATIONS, 0)
+        self.throttles = 0
+        self.ids = itertools.count(1)
+        self.workloads = {}
+        self.answers = {}
+        self.lenses = {
+            STANDARD_LENS_ALIAS: {
+                'LensArn': f'arn:aws:wellarchitected::aws:lens/{STANDARD_LENS_ALIAS}',
+                'LensAlias': STANDARD_LENS_ALIAS,
+                'LensName': STANDARD_LENS_ALIAS,
+                'LensType': 'AWS_OFFICIAL',
+                'LensVersion': '2023-10-03',
+                'catalog': standard_catalog
+            }
+        }
+
+    def __getattribute__(self, name):
+        attribute = super().__getattribute__(name)
+        if name not in OPERATIONS:
+            return attribute
+        def validated_operation(**params):
+            known_parameters = INPUT_SHAPES[name].members
+            unknown_parameters = [parameter for parameter in params if parameter not in known_parameters]
+            if unknown_parameters:
+                raise ParamValidationError(report=f'Unknown parameter in input: "{unknown_parameters[0]}", must be one of: {", ".join(known_parameters)}')
+            return attribute(**params)
+        return validated_operation
+
+    def call_count(self):
+        return sum(self.calls.values())
+
+    def request(self, operation):
+        with self.lock:
+            self.calls[operation] += 1
+            throttled = self.random.random() < self.throttle_rate
+            if throttled:
+                self.throttles += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, operation)
+
+    def page(self, result_key, items, MaxResults=None, NextToken=None):
+        size = min(self.page_size, MaxResults or self.page_size)
+        start = int(NextToken or 0)
+        response = {result_key: items[start:start + size]}
+        if start + size < len(items):
+            response['NextToken'] = str(start + size)
+        return response
+
+    def lens(self, lens_alias):
+        if lens_alias not in self.lenses:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': f'Lens {lens_alias} not found'}}, 'lens')
+        return self.lenses[lens_alias]
+
+    def answer(self, workload_id, lens_alias, question_id):
+        with self.lock:
+            return self.answers.setdefault((workload_id, lens_alias, question_id), {'IsApplicable': True, 'Notes': '', 'ChoiceAnswers': {}})
+
+    def list_workloads(self, MaxResults=None, NextToken=None, WorkloadNamePrefix=''):
+        self.request('list_workloads')
+        summaries = [{'WorkloadId': workload['WorkloadId'], 'WorkloadName': workload['WorkloadName'], 'Lenses': workload['Lenses'],
+                      'UpdatedAt': workload['UpdatedAt']}
+                     for workload in self.workloads.values() if workload['WorkloadName'].startswith(WorkloadNamePrefix)]
+        return self.page('WorkloadSummaries', summaries, MaxResults, NextToken)
+
+    def list_lenses(self, MaxResults=None, NextToken=None, **kwargs):
+        self.request('list_lenses')
+        summaries = [{key: value for key, value in lens.items() if key not in ('catalog', 'draft', 'versions')} for lens in self.lenses.values()]
+        return self.page('LensSummaries', summaries, MaxResults, NextToken)
+
+    def create_workload(self, WorkloadName, Lenses, **kwargs):
+        self.request('create_workload')
+        workload_id = f'workload-{next(self.ids)}'
+        with self.lock:
+            self.workloads[workload_id] = dict(kwargs, WorkloadId=workload_id, WorkloadName=WorkloadName, Lenses=list(Lenses), UpdatedAt=time.time())
+        return {'WorkloadId': workload_id, 'WorkloadArn': f'arn:aws:wellarchitected:::workload/{workload_id}'}
+
+    def get_workload(self, WorkloadId):
+        self.request('get_workload')
+        return {'Workload': copy.deepcopy(self.workloads[WorkloadId])}
+
+    def associate_lenses(self, WorkloadId, LensAliases):
+        self.request('associate_lenses')
+        with self.lock:
+            self.workloads[WorkloadId]['Lenses'].extend(LensAliases)
+        return {}
+
+    def list_answers(self, WorkloadId, LensAlias, PillarId, MaxResults=None, NextToken=None, **kwargs):
+        self.request('list_answers')
+        summaries = []
+        for question in self.lens(LensAlias)['catalog'].get(PillarId, []):
+            answer = self.answer(WorkloadId, LensAlias, question['QuestionId'])
+            summaries.append(dict(
+                copy.deepcopy(question),
+                PillarId=PillarId,
+                IsApplicable=answer['IsApplicable'],
+                SelectedChoices=[choice_id for choice_id, choice in answer['ChoiceAnswers'].items() if choice['Status'] == 'SELECTED'],
+                ChoiceAnswerSummaries=[dict(choice, ChoiceId=choice_id) for choice_id, choice in answer['ChoiceAnswers'].items()]))
+        return self.page('AnswerSummaries', summaries, MaxResults, NextToken)
+
+    def get_answer(self, WorkloadId, LensAlias, QuestionId, **kwargs):
+        self.request('get_answer')
+        self.lens(LensAlias)
+        answer = self.answer(WorkloadId, LensAlias, QuestionId)
+        with self.lock:
+            result = {
+                'QuestionId': QuestionId,
+                'IsApplicable': answer['IsApplicable'],
+                'SelectedChoices': [choice_id for choice_id, choice in answer['ChoiceAnswers'].items() if choice['Status'] == 'SELECTED'],
+                'ChoiceAnswers': [dict(choice, ChoiceId=choice_id) for choice_id, choice in answer['ChoiceAnswers'].items()]
+            }
+            if answer['Notes']:
+                result['Notes'] = answer['Notes']
+        return {'WorkloadId': WorkloadId, 'LensAlias': LensAlias, 'Answer': result}
+
+    def update_answer(self, WorkloadId, LensAlias, QuestionId, ChoiceUpdates=None, Notes=None, IsApplicable=None, **kwargs):
+        self.request('update_answer')
+        self.lens(LensAlias)
+        answer = self.answer(WorkloadId, LensAlias, QuestionId)
+        with self.lock:
+            if WorkloadId in self.workloads:
+                self.workloads[WorkloadId]['UpdatedAt'] = time.time()
+            if IsApplicable is not None:
+                answer['IsApplicable'] = IsApplicable
+            if Notes is not None:
+                answer['Notes'] = Notes
+            for choice_id, choice_update in (ChoiceUpdates or {}).items():
+                if choice_update['Status'] == 'UNSELECTED':
+                    answer['ChoiceAnswers'].pop(choice_id, None)
+                else:
+                    answer['ChoiceAnswers'][choice_id] = dict(choice_update)
+        return {'WorkloadId': WorkloadId, 'LensAlias': LensAlias}
+
+    def import_lens(self, JSONString, LensAlias=None, **kwargs):
+        self.request('import_lens')
+        lens_json = json.loads(JSONString)
+        catalog = {pillar['id']: [{'QuestionId': question['id'],
+                                   'QuestionTitle': question['title'],
+                                   'Choices': [{'ChoiceId': choice['id'], 'Title': choice['title']} for choice in question['choices']]}
+                                  for question in pillar['questions']]
+                   for pillar in lens_json['pillars']}
+        with self.lock:
+            lens_arn = LensAlias or f'arn:aws:wellarchitected:eu-central-1:111111111111:lens/{next(self.ids)}'
+            lens = self.lenses.setdefault(lens_arn, {'LensArn': lens_arn, 'LensName': lens_json['name'], 'LensType': 'CUSTOM_SELF'})
+            lens['catalog'] = catalog
+            lens['draft'] = JSONString
+        return {'LensArn': lens_arn, 'Status': 'COMPLETE'}
+
+    def create_lens_version(self, LensAlias, LensVersion, **kwargs):
+        self.request('create_lens_version')
+        with self.lock:
+            lens = self.lens(LensAlias)
+            lens['LensVersion'] = LensVersion
+            lens.setdefault('versions', {})[LensVersion] = lens['draft']
+        return {'LensArn': LensAlias, 'LensVersion': LensVersion}
+
+    def export_lens(self, LensAlias, LensVersion=None):
+        self.request('export_lens')
+        lens = self.lens(LensAlias)
+        return {'LensJSON': lens.get('versions', {}).get(LensVersion, lens.get('draft'))}
+
+    def get_lens_review(self, WorkloadId, LensAlias, MilestoneNumber=None):
+        self.request('get_lens_review')
+        lens = self.lens(LensAlias)
+        pillar_reviews = []
+        for pillar_id, questions in lens['catalog'].items():
+            risk_counts = dict.fromkeys(['UNANSWERED', 'HIGH', 'MEDIUM', 'NONE', 'NOT_APPLICABLE'], 0)
+            for question in questions:
+                risk_counts[self.question_risk(WorkloadId, LensAlias, question)] += 1
+            pillar_reviews.append({'PillarId': pillar_id, 'PillarName': pillar_id, 'RiskCounts': risk_counts})
+        lens_review = {
+            'LensAlias': LensAlias,
+            'LensArn': lens['LensArn'],
+            'LensName': lens['LensName'],
+            'LensVersion': lens.get('LensVersion', ''),
+            'PillarReviewSummaries': pillar_reviews
+        }
+        return {'WorkloadId': WorkloadId, 'LensReview': lens_review}
+
+    def list_lens_review_improvements(self, WorkloadId, LensAlias, MaxResults=None, NextToken=None, **kwargs):
+        self.request('list_lens_review_improvements')
+        improvements = []
+        for pillar_id, questions in self.lens(LensAlias)['catalog'].items():
+            for question in questions:
+                risk = self.question_risk(WorkloadId, LensAlias, question)
+                if risk not in ('HIGH', 'MEDIUM'):
+                    continue
+                choice_answers = self.answer(WorkloadId, LensAlias, question['QuestionId'])['ChoiceAnswers']
+                improvements.append({
+                    'QuestionId': question['QuestionId'],
+                    'PillarId': pillar_id,
+                    'QuestionTitle': question['QuestionTitle'],
+                    'Risk': risk,
+                    'ImprovementPlans': [{'ChoiceId': choice['ChoiceId'], 'DisplayText': choice['Title']}
+                                         for choice in question['Choices'][:-1] if choice['ChoiceId'] not in choice_answers]
+                })
+        return self.page('ImprovementSummaries', improvements, MaxResults, NextToken)
+
+    def question_risk(self, workload_id, lens_alias, question):
+        answer = self.answer(workload_id, lens_alias, question['QuestionId'])
+        if not answer['IsApplicable']:
+            return 'NOT_APPLICABLE'
+        if not answer['ChoiceAnswers']:
+            return 'UNANSWERED'
+        best_practices = question['Choices'][:-1]
+        missing = [choice for choice in best_practices if choice['ChoiceId'] not in answer['ChoiceAnswers']]
+        if not missing:
+            return 'NONE'
+        return 'HIGH' if len(missing) * 2 > len(best_practices) else 'MEDIUM'
@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+import yaml
+
+import config.config as conf
+import wafr.model as model
+import wafr.template as template
+from wafr.errors import TemplateError
+
+PILLAR = ['SEC', 'security']
+SAMPLE_VALUES = [
+    'yes', 'No', 'on', 'OFF', 'y', 'true', 'null', 'Null', '~', '', '1', '-1', '1.0', '1e3', '.inf', '-.Inf', '.nan',
+    '0x1F', '0o17', '017', '1_000', '2024-01-01', '2024-01-01T12:30:00Z', '12:30:45', '=', '<<',
+    ' leading space', 'trailing space ', '  both  ', ' ', '\tleading tab', 'trailing tab\t',
+    'a # comment', '#start', 'key: value', 'ends with colon:', ':start', 'a:b', 'http://example.com/#anchor',
+    '- dash', '? question', '&anchor', '*alias', '!tag', '%directive', '@at', '`backtick', '{flow: map}', '[flow, seq]',
+    '|', '>', ',comma', "single ' quote", 'double " quote', 'back \\ slash', '---', '...',
+    'line one\nline two', 'paragraph\n\nafter blank line', '\nleading newline', 'trailing newline\n', '\n', 'indented\n  second line',
+    'line # comment\nkey: value', ' leading space\nsecond line', 'crlf\r\nline', 'tab\tinside',
+    'nel\x85inside', 'line\u2028separator', 'paragraph\u2029separator', 'bell\x07', 'delete\x7f',
+    'bom\ufeffinside', 'café ✓', 'emoji \U0001f600'
+]
+LOADERS = [('SafeLoader', yaml.SafeLoader), ('template loader', model.YamlLoader)]
+
+
+def main():
+    argparse.ArgumentParser(description='Check that text written into generated templates reads back unchanged when the template is loaded.').parse_args()
+    content = '\n'.join(template_document()) + '\n'
+    mismatches = []
+    for loader_name, loader in LOADERS:
+        try:
+            questions = list(model.compile_template(yaml.load(content, Loader=loader), 'roundtrip').questions())
+        except (yaml.YAMLError, TemplateError) as error:
+            mismatches.append(f'{loader_name}: the template does not load: {error}')
+            continue
+        if len(questions) != len(SAMPLE_VALUES):
+            mismatches.append(f'{loader_name}: wrote {len(SAMPLE_VALUES)} questions, read {len(questions)}')
+        for value, question in zip(SAMPLE_VALUES, questions):
+            mismatches.extend(f'{loader_name}: {field}: wrote {value!r}, read {read!r}'
+                              for field, read in read_values(question) if read != value)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f'Values checked: {len(SAMPLE_VALUES)}, loaders: {len(LOADERS)}, mismatches: {len(mismatches)}')
+    if mismatches:
+        sys.exit(1)
+
+def template_document():
+    yield template.new_line(template.INDENT_0, conf.LENS_KEY, template.yaml_scalar('roundtrip'))
+    yield from template.template_lines(sample_entries(), save_workload=True)
+
+def sample_entries():
+    yield PILLAR, None, None
+    for index, value in enumerate(SAMPLE_VALUES):
+        question = {'QuestionId': value, 'QuestionTitle': value, 'Choices': [{'ChoiceId': value, 'Title': value}]}
+        answer = {'Notes': value, 'ChoiceAnswers': [{'ChoiceId': value, 'Status': 'NOT_APPLICABLE', 'Reason': value, 'Notes': value}]}
+        yield PILLAR, question, answer
+
+def read_values(question):
+    choice = question.answers[0]
+    return [('question id', question.question_id), ('question title', question.title), ('question notes', question.notes),
+            ('choice id', choice.id), ('choice title', choice.title), ('choice reason', choice.reason), ('choice notes', choice.notes)]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import config.config as conf
+import wafr.cache as cache
+import wafr.client as client
+import wafr.lens as lens
+import wafr.model as model
+import wafr.template as template
+import wafr.workload as workload
+from benchmarks import synthetic
+from benchmarks.fake_service import FakeWellArchitected, STANDARD_LENS_ALIAS
+
+SCENARIOS = ['generate_new_template', 'apply_marks_in_well_architected_tool', 'disable_standard_questions', 'publish_lens']
+RESULT_COLUMNS = [('scenario', 'SCENARIO'), ('size', 'SIZE'), ('questions', 'QUESTIONS'), ('api_calls', 'API CALLS'),
+                  ('throttles', 'THROTTLES'), ('wall_seconds', 'WALL S'), ('peak_mb', 'PEAK MB')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the import and export paths of the CLI against an in-process fake Well-Architected Tool service.')
+    parser.add_argument('--sizes', nargs='*', choices=list(synthetic.SIZES), default=['tiny', 'standard', 'large'], help='Synthetic lens sizes to run.')
+    parser.add_argument('--scenarios', nargs='*', choices=SCENARIOS, default=SCENARIOS, help='Scenarios to run.')
+    parser.add_argument('--latency', type=float, default=0.005, help='Simulated latency of every API call in seconds.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of API calls answered with a ThrottlingException.')
+    parser.add_argument('--page-size', type=int, default=50, help='Maximum number of items returned per page by list operations.')
+    parser.add_argument('--concurrency', type=int, default=conf.DEFAULT_CONCURRENCY, help='Concurrency passed to the export path.')
+    parser.add_argument('--requests-per-second', type=float, default=conf.API_REQUESTS_PER_SECOND, help='Initial request rate of the request scheduler.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.', metavar='RESULT_FILE_PATH')
+    parser.add_argument('--baseline', help='Compare the results with an earlier result file and fail on regressions.', metavar='RESULT_FILE_PATH')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative wall time increase compared to the baseline.')
+    args = parser.parse_args()
+
+    conf.API_REQUESTS_PER_SECOND = args.requests_per_second
+    conf.API_RETRY_BASE_SECONDS = min(conf.API_RETRY_BASE_SECONDS, 0.01)
+    cache.configure(enabled=False)
+    results = []
+    with tempfile.TemporaryDirectory() as work_directory:
+        for size in args.sizes:
+            for scenario in args.scenarios:
+                results.append(run_scenario(scenario, size, work_directory, args))
+                print_row(results[-1], first=len(results) == 1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and not compare_with_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+def run_scenario(scenario, size, work_directory, args):
+    question_count = synthetic.SIZES[size]
+    timed_run = SCENARIO_SETUPS[scenario](question_count, work_directory, args)
+    calls_before = timed_run['service'].call_count()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        timed_run['run']()
+    wall_seconds = time.perf_counter() - started
+    api_calls = timed_run['service'].call_count() - calls_before
+
+    traced_run = SCENARIO_SETUPS[scenario](question_count, work_directory, args)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        traced_run['run']()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'scenario': scenario,
+        'size': size,
+        'questions': question_count,
+        'api_calls': api_calls,
+        'throttles': timed_run['service'].throttles,
+        'wall_seconds': round(wall_seconds, 4),
+        'peak_mb': round(peak_bytes / 1024 / 1024, 2)
+    }
+
+def new_service(question_count, args):
+    reset_state()
+    service = FakeWellArchitected(synthetic.lens_catalog(question_count), page_size=args.page_size)
+    client.register_client(service)
+    return service
+
+def prepared_run(service, run, args):
+    service.latency = args.latency
+    service.throttle_rate = args.throttle_rate
+    return {'service': service, 'run': run}
+
+def reset_state():
+    client.reset_clients()
+    lens.lens_summaries.clear()
+    lens.lens_indexes.clear()
+    lens.lens_index_cached.clear()
+    workload.workload_indexes.clear()
+    model.loaded_templates.clear()
+
+def load_template(catalog, work_directory, marked=True):
+    template_file_path = os.path.join(work_directory, 'template.yaml')
+    synthetic.write_template(catalog, STANDARD_LENS_ALIAS, template_file_path, marked)
+    return model.load_template(template_file_path)
+
+def setup_generate_new_template(question_count, work_directory, args):
+    service = new_service(question_count, args)
+    workload_id = service.create_workload(WorkloadName='benchmark', Lenses=[STANDARD_LENS_ALIAS])['WorkloadId']
+    marked_template = load_template(service.lenses[STANDARD_LENS_ALIAS]['catalog'], work_directory)
+    for answer_update in workload.plan_answer_updates(marked_template):
+        service.update_answer(WorkloadId=workload_id, LensAlias=STANDARD_LENS_ALIAS, **answer_update)
+    output_file = os.path.join(work_directory, 'export.yaml')
+    return prepared_run(service, lambda: template.write_template(output_file, template.generate_new_template(workload_id, True, '', args.concurrency)), args)
+
+def setup_apply_marks(question_count, work_directory, args):
+    service = new_service(question_count, args)
+    workload_id = service.create_workload(WorkloadName='benchmark', Lenses=[STANDARD_LENS_ALIAS])['WorkloadId']
+    marked_template = load_template(service.lenses[STANDARD_LENS_ALIAS]['catalog'], work_directory)
+    return prepared_run(service, lambda: workload.apply_marks_in_well_architected_tool(workload_id, marked_template, STANDARD_LENS_ALIAS), args)
+
+def setup_disable_standard_questions(question_count, work_directory, args):
+    service = new_service(question_count, args)
+    workload_id = service.create_workload(WorkloadName='benchmark', Lenses=[STANDARD_LENS_ALIAS])['WorkloadId']
+    standard_template = load_template(service.lenses[STANDARD_LENS_ALIAS]['catalog'], work_directory, marked=False)
+    return prepared_run(service, lambda: workload.disable_standard_questions(workload_id, standard_template), args)
+
+def setup_publish_lens(question_count, work_directory, args):
+    service = new_service(question_count, args)
+    lens_file_path = os.path.join(work_directory, 'lens.json')
+    synthetic.write_lens(synthetic.lens_catalog(question_count), 'Benchmark lens', lens_file_path)
+    return prepared_run(service, lambda: lens.publish_lens(lens_file_path, '1.0'), args)
+
+SCENARIO_SETUPS = {
+    'generate_new_template': setup_generate_new_template,
+    'apply_marks_in_well_architected_tool': setup_apply_marks,
+    'disable_standard_questions': setup_disable_standard_questions,
+    'publish_lens': setup_publish_lens
+}
+
+def print_row(result, first):
+    widths = [max(len(header), 12) for _, header in RESULT_COLUMNS]
+    widths[0] = 38
+    if first:
+        print('  '.join(header.ljust(width) for (_, header), width in zip(RESULT_COLUMNS, widths)).rstrip())
+    print('  '.join(str(result[key]).ljust(width) for (key, _), width in zip(RESULT_COLUMNS, widths)).rstrip(), flush=True)
+
+def compare_with_baseline(results, baseline_file_path, tolerance):
+    with open(baseline_file_path) as f:
+        baseline = {(result['scenario'], result['size']): result for result in json.load(f)}
+    passed = True
+    for result in results:
+        previous = baseline.get((result['scenario'], result['size']))
+        if previous is None:
+            continue
+        if result['api_calls'] > previous['api_calls']:
+            print(f"Regression: {result['scenario']} {result['size']} needs {result['api_calls']} API calls instead of {previous['api_calls']}")
+            passed = False
+        if result['wall_seconds'] > previous['wall_seconds'] * (1 + tolerance):
+            print(f"Regression: {result['scenario']} {result['size']} took {result['wall_seconds']}s instead of {previous['wall_seconds']}s")
+            passed = False
+    return passed
+
+
+if __name__ == '__main__':
+    main()
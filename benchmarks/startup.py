@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(ROOT_DIRECTORY, 'wafr-cli.py')
+IMPORTED_MODULES = ['wafr.template', 'wafr.workload', 'wafr.lens', 'wafr.fleet', 'boto3']
+RESULT_COLUMNS = [('measurement', 'MEASUREMENT'), ('median_seconds', 'MEDIAN S'), ('min_seconds', 'MIN S'), ('max_seconds', 'MAX S')]
+
+
+class FakeEndpoint(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.first_request = self.server.first_request or time.time()
+        self.respond({'WorkloadSummaries': [], 'LensSummaries': []})
+
+    do_GET = do_POST
+
+    def respond(self, body):
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the start-up time of the CLI: module import time, --help and the time until the first API call reaches a local fake endpoint.')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of runs per measurement.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.', metavar='RESULT_FILE_PATH')
+    args = parser.parse_args()
+
+    results = []
+    for module_name in IMPORTED_MODULES:
+        results.append(measure(f'import {module_name}', args.repeat, lambda: import_time(module_name)))
+        print_row(results[-1], first=len(results) == 1)
+    results.append(measure('wafr-cli.py --help', args.repeat, lambda: command_time(['--help'])))
+    print_row(results[-1], first=False)
+    with fake_endpoint() as server:
+        results.append(measure('time to first API call', args.repeat, lambda: first_call_time(server)))
+        print_row(results[-1], first=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+def measure(measurement, repeat, run):
+    durations = [run() for _ in range(repeat)]
+    return {
+        'measurement': measurement,
+        'median_seconds': round(statistics.median(durations), 4),
+        'min_seconds': round(min(durations), 4),
+        'max_seconds': round(max(durations), 4)
+    }
+
+def import_time(module_name):
+    code = f'import time; started = time.perf_counter(); import {module_name}; print(time.perf_counter() - started)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIRECTORY, capture_output=True, text=True, check=True).stdout
+    return float(output)
+
+def command_time(arguments, environment=None):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, CLI_PATH] + arguments, cwd=ROOT_DIRECTORY, env=environment, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+def first_call_time(server):
+    environment = dict(os.environ,
+                       AWS_ENDPOINT_URL_WELLARCHITECTED=f'http://127.0.0.1:{server.server_port}',
+                       AWS_ACCESS_KEY_ID='benchmark',
+                       AWS_SECRET_ACCESS_KEY='benchmark',
+                       AWS_DEFAULT_REGION='eu-central-1',
+                       AWS_CONFIG_FILE=os.devnull,
+                       AWS_SHARED_CREDENTIALS_FILE=os.devnull,
+                       AWS_EC2_METADATA_DISABLED='true')
+    environment.pop('AWS_PROFILE', None)
+    server.first_request = None
+    started = time.time()
+    command_time(['--no-cache', 'manage-template', '--listworkloads'], environment)
+    return server.first_request - started
+
+@contextmanager
+def fake_endpoint():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeEndpoint)
+    server.first_request = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def print_row(result, first):
+    widths = [28, 12, 12, 12]
+    if first:
+        print('  '.join(header.ljust(width) for (_, header), width in zip(RESULT_COLUMNS, widths)).rstrip())
+    print('  '.join(str(result[key]).ljust(width) for (key, _), width in zip(RESULT_COLUMNS, widths)).rstrip(), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import json
+
+import yaml
+
+PILLAR_IDS = ['security', 'reliability', 'operationalExcellence', 'performance', 'costOptimization', 'sustainability']
+SIZES = {
+    'tiny': 6,
+    'standard': 58,
+    'large': 600,
+    'huge': 3000
+}
+
+
+def lens_catalog(question_count, choices_per_question=6):
+    catalog = {pillar_id: [] for pillar_id in PILLAR_IDS}
+    for index in range(question_count):
+        pillar_id = PILLAR_IDS[index % len(PILLAR_IDS)]
+        question_id = f'{pillar_id}-question-{index}'
+        choices = [{'ChoiceId': f'{question_id}_choice_{number}', 'Title': f'Best practice {number} of question {index}'}
+                   for number in range(choices_per_question)]
+        choices.append({'ChoiceId': f'{question_id}_no', 'Title': 'None of these'})
+        catalog[pillar_id].append({
+            'QuestionId': question_id,
+            'QuestionTitle': f'How do you handle synthetic concern number {index}?',
+            'Choices': choices
+        })
+    return catalog
+
+def template_content(catalog, lens_name, marked=True):
+    template = {'lens': lens_name}
+    for pillar_id in PILLAR_IDS:
+        questions = []
+        for index, question in enumerate(catalog[pillar_id], start=1):
+            entry = {
+                'label': f'{pillar_id.upper()} {index}',
+                'question_id': question['QuestionId'],
+                'title': question['QuestionTitle']
+            }
+            if marked and index % 10 == 0:
+                entry['notes'] = 'Solved by the landing zone.'
+                entry['not_applicable'] = True
+            else:
+                entry['answers'] = [choice_entry(choice, position, marked) for position, choice in enumerate(question['Choices'][:-1])]
+                if marked and index % 3 == 0:
+                    entry['notes'] = f'Handled centrally.\nSee the runbook for {question["QuestionId"]}.'
+            questions.append(entry)
+        template[pillar_id] = questions
+    return template
+
+def choice_entry(choice, position, marked):
+    entry = {'id': choice['ChoiceId'], 'title': choice['Title']}
+    if marked and position < 3:
+        entry['status'] = 'SELECTED'
+    elif marked and position == 3:
+        entry.update(status='NOT_APPLICABLE', reason='ARCHITECTURE_CONSTRAINTS', notes='Not used by this workload.')
+    return entry
+
+def write_template(catalog, lens_name, template_file_path, marked=True):
+    with open(template_file_path, 'w') as f:
+        yaml.safe_dump(template_content(catalog, lens_name, marked), f, sort_keys=False)
+
+def lens_document(catalog, lens_name):
+    return {
+        'schemaVersion': '2021-11-01',
+        'name': lens_name,
+        'description': f'Synthetic lens with {sum(len(questions) for questions in catalog.values())} questions',
+        'pillars': [{
+            'id': pillar_id,
+            'name': pillar_id,
+            'questions': [{
+                'id': question['QuestionId'],
+                'title': question['QuestionTitle'],
+                'choices': [{
+                    'id': choice['ChoiceId'],
+                    'title': choice['Title'],
+                    'improvementPlan': {'displayText': f'Implement {choice["Title"].lower()}.'}
+                } for choice in question['Choices']],
+                'riskRules': [
+                    {'condition': 'default', 'risk': 'HIGH_RISK'}
+                ]
+            } for question in catalog[pillar_id]]
+        } for pillar_id in PILLAR_IDS]
+    }
+
+def write_lens(catalog, lens_name, lens_file_path):
+    with open(lens_file_path, 'w') as f:
+        json.dump(lens_document(catalog, lens_name), f)
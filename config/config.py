@@ -1,3 +1,5 @@
+import os
+
 LENS_KEY = 'lens'
 
 STANDARD_LENS_ALIAS = 'wellarchitected'
@@ -5,3 +7,28 @@ EKS_LENS_ALIAS = 'tsyeks'
 
 STANDARD_LENS_LABEL = 'wellarchitected'
 EKS_LENS_LABEL = 'T-Systems EKS lens'
+
+DEFAULT_CONCURRENCY = 8
+MAX_POOL_CONNECTIONS = 50
+
+API_REQUESTS_PER_SECOND = 50
+API_MIN_REQUESTS_PER_SECOND = 1
+API_MAX_REQUESTS_PER_SECOND = 200
+API_OPERATION_REQUESTS_PER_SECOND = {}
+API_BURST = 50
+API_RATE_INCREASE = 0.5
+API_BACKOFF_INTERVAL_SECONDS = 0.2
+API_INITIAL_CONCURRENCY = 8
+API_MAX_CONCURRENCY = MAX_POOL_CONNECTIONS
+API_MAX_ATTEMPTS = 10
+API_RETRY_BASE_SECONDS = 0.2
+API_RETRY_MAX_SECONDS = 20
+
+CACHE_DIR = os.environ.get('WAFR_CLI_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.wafr-cli', 'cache'))
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_EVICTION_TARGET_BYTES = 40 * 1024 * 1024
+
+JOURNAL_DIR = os.environ.get('WAFR_CLI_JOURNAL_DIR', os.path.join(os.path.expanduser('~'), '.wafr-cli', 'journal'))
+
+STORE_PATH = os.environ.get('WAFR_CLI_STORE')
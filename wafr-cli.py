@@ -1,12 +1,19 @@
 import argparse
+import sys
 
-import wafr.template as template
-import wafr.workload as workload
-import wafr.lens as lens
+import wafr.cache as cache
+import wafr.profiler as profiler
+from wafr.errors import TemplateError, ManifestError, MigrationError, LensError, StoreError, ReportError
 import config.config as conf
 
 def main():
     parser = argparse.ArgumentParser(description='Well-architected framework review CLI tool is helping to handle automatically some well-architected tool functionalities. See subcommands for more details.')
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true', help='Do not read or write the local lens cache.')
+    cache_group.add_argument('--refresh-cache', action='store_true', help='Ignore the cached lens data and fetch it again from the Well-Architected Tool.')
+    parser.add_argument('--stats', action='store_true', help='Print the number of API calls, retries and throttles per operation at the end of the run.')
+    parser.add_argument('--profile', help='Write a JSON profile with per-operation latency percentiles and a Chrome trace timeline to this file.', metavar='PROFILE_FILE_PATH')
+    parser.add_argument('--store', help='Local SQLite file where manage-template saves a snapshot of every exported workload, read by manage-template --from-store and query. Defaults to the WAFR_CLI_STORE environment variable.', metavar='STORE_FILE_PATH', default=conf.STORE_PATH)
     subparsers = parser.add_subparsers(help='Select one of the subcommands.')
 
     manage_template_parser = subparsers.add_parser(
@@ -17,6 +24,10 @@ def main():
     manage_template_parser.add_argument('-s', '--saveworkload', action='store_true', help='By activating this option the content of the workload will be saved to the template. If not used the behaviour is that a new default template is generated', default='')
     manage_template_parser.add_argument('-l', '--listworkloads', action='store_true', help='List the available workload ids of the currently used account.', default='')
     manage_template_parser.add_argument('-c', '--customlens', help='Generate custom lens template from an already existing custom lens workload.', choices=[conf.EKS_LENS_ALIAS], default='')
+    manage_template_parser.add_argument('--concurrency', help='Maximum number of parallel API calls used while exporting the questions and answers.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
+    manage_template_parser.add_argument('--all', action='store_true', help='Export the questions and answers of every workload using the selected lens into the --outdir folder. Workloads which did not change since the last export are skipped.')
+    manage_template_parser.add_argument('--outdir', help='Folder where the templates are saved by --all, one file per workload id.', metavar='OUTPUT_DIRECTORY', default='')
+    manage_template_parser.add_argument('--from-store', action='store_true', help='Generate the template from the latest snapshot in the --store file instead of calling the Well-Architected Tool.')
     manage_template_parser.set_defaults(func=manage_template)
 
     create_workload_parser = subparsers.add_parser(
@@ -32,6 +43,7 @@ def main():
     create_workload_parser.add_argument('-o', '--reviewowner', help='The name of the reviewer who created this WAFR workload.', required=True)
     create_workload_parser.add_argument('-ds', '--disablestandard', action='store_true', help='Disable the questions from the standard lens. Usable when the workload is created with custom lens. Ineffectiv with standard lens.')
     create_workload_parser.add_argument('-ta', '--trustedadvisor', help='Enable or disable the Trusted Advisor integration [enable, disable]', choices=['enable','disable'])
+    create_workload_parser.add_argument('--resume', action='store_true', help='Continue an interrupted run with the same arguments: reuse the workload created by it and skip the answers it already updated.')
     create_workload_parser.set_defaults(func=create_new_workload)
 
     update_workload_parser = subparsers.add_parser(
@@ -41,30 +53,133 @@ def main():
     update_workload_parser.add_argument('-t', '--templatefile', help='Template file path used to create a new workload from. Default templates in the templates folder.', metavar='TEMPLATE_FILE_PATH', required=True, default='templates/standard.yaml') 
     update_workload_parser.add_argument('-w', '--workloadname', help='Name of the updated workload.', required=True) 
     update_workload_parser.add_argument('-ds', '--disablestandard', action='store_true', help='Disable the questions from the standard lens. Usable when the workload is created with custom lens. Ineffectiv with standard lens.')
+    update_workload_parser.add_argument('--delta', action='store_true', help='Read the current answers of the workload and update only the questions which differ from the template.')
+    update_workload_parser.add_argument('--plan', action='store_true', help='Show the differences between the workload and the template without updating the workload.')
+    update_workload_parser.add_argument('--concurrency', help='Maximum number of parallel API calls used while reading the current answers.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
+    update_workload_parser.add_argument('--resume', action='store_true', help='Continue an interrupted run with the same arguments and skip the answers it already updated.')
     update_workload_parser.set_defaults(func=update_workload)
 
+    fleet_parser = subparsers.add_parser(
+        name='fleet',
+        description='Create or update many workloads in parallel from a manifest. The manifest is a YAML list or a CSV file with the columns ' +
+                    'name, description, environment, account_ids, regions, template, lens, owner and optionally region, disable_standard, trusted_advisor. ' +
+                    'Workloads which do not exist yet are created, the others are updated.')
+    fleet_parser.add_argument('-m', '--manifest', help='YAML or CSV manifest file describing the workloads.', metavar='MANIFEST_FILE_PATH', required=True)
+    fleet_parser.add_argument('--concurrency', help='Maximum number of workloads processed in parallel.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
+    fleet_parser.add_argument('--delta', action='store_true', help='Update only the questions of existing workloads which differ from the template.')
+    fleet_parser.set_defaults(func=run_fleet)
+
+    migrate_workload_parser = subparsers.add_parser(
+        name='migrate-workload',
+        description='Copy a workload with its metadata, lenses and all answers to another account or region. The answers are applied to the target ' +
+                    'while they are still being read from the source, and the copied answers are verified at the end. ' +
+                    'An existing target workload with the same name is updated.')
+    migrate_workload_parser.add_argument('-w', '--workloadid', help='Id of the workload to copy.', required=True)
+    migrate_workload_parser.add_argument('-n', '--workloadname', help='Name of the target workload. Defaults to the name of the source workload.', default='')
+    migrate_workload_parser.add_argument('--source-profile', help='AWS profile of the source account. Defaults to the current profile.', default=None)
+    migrate_workload_parser.add_argument('--source-region', help='Region of the source workload. Defaults to the current region.', default=None)
+    migrate_workload_parser.add_argument('--target-profile', help='AWS profile of the target account. Defaults to the current profile.', default=None)
+    migrate_workload_parser.add_argument('--target-region', help='Region of the target workload. Defaults to the current region.', default=None)
+    migrate_workload_parser.add_argument('--concurrency', help='Maximum number of parallel API calls used on each side.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
+    migrate_workload_parser.set_defaults(func=migrate_workload)
+
     publish_lens_parser = subparsers.add_parser(
         name='publish-lens', 
         description='Publish a new custom lens version or creates a new one if does not exist.')
-    publish_lens_parser.add_argument('-t', '--templatepath', help='Create a new custom lens version from template. Example templates are in the lenses folder.', metavar='LENS_FILE_PATH', required=True, default='')
+    lens_source_group = publish_lens_parser.add_mutually_exclusive_group(required=True)
+    lens_source_group.add_argument('-t', '--templatepath', help='Create a new custom lens version from template. Example templates are in the lenses folder.', metavar='LENS_FILE_PATH', default='')
+    lens_source_group.add_argument('--dir', help='Validate every lens JSON file of the folder and publish them in parallel. Nothing is published if any of the files is invalid.', metavar='LENS_DIRECTORY', default='')
     publish_lens_parser.add_argument('-v', '--lensversion', help='Publish a new version of your the lens.', required=True, default='')
+    publish_lens_parser.add_argument('--concurrency', help='Maximum number of lenses published in parallel with --dir.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
     publish_lens_parser.set_defaults(func=publish_lens)
 
+    query_parser = subparsers.add_parser(
+        name='query',
+        description='Query the workload snapshots saved in the --store file by manage-template. The queries run locally without API calls.')
+    query_group = query_parser.add_mutually_exclusive_group(required=True)
+    query_group.add_argument('--selected', help='List the workloads whose latest snapshot selects this choice.', metavar='CHOICE_ID')
+    query_group.add_argument('--not-selected', help='List the workloads whose latest snapshot does not select this choice.', metavar='CHOICE_ID')
+    query_group.add_argument('--history', help='Show the answers of the workload which changed between its latest snapshot and the previous one, or the last one before --since.', metavar='WORKLOAD_ID')
+    query_group.add_argument('--snapshots', action='store_true', help='List the stored workloads with the number and date of their snapshots.')
+    query_group.add_argument('--sql', help='Run a read-only SQL query against the store.', metavar='QUERY')
+    query_parser.add_argument('--lens', help='Limit the query to this lens alias. --history uses the standard lens by default.', metavar='LENS_ALIAS', default=None)
+    query_parser.add_argument('--since', help='Compare the latest snapshot of --history with the last snapshot taken before this date, e.g. 2024-01-31.', metavar='DATE', default='')
+    query_parser.set_defaults(func=query)
+
+    report_parser = subparsers.add_parser(
+        name='report',
+        description='Collect the lens reviews and improvement summaries of every workload and lens in parallel and write them with per-pillar and per-choice rollups ' +
+                    'as pillars, improvements, pillar-rollup and choice-rollup tables. Workloads which did not change since the last report are read from the cache.')
+    report_parser.add_argument('--outdir', help='Folder where the report tables are saved.', metavar='OUTPUT_DIRECTORY', required=True)
+    report_parser.add_argument('--format', help='Format of the report tables. Parquet requires the pyarrow package.', choices=['csv', 'parquet'], default='csv')
+    report_parser.add_argument('--concurrency', help='Maximum number of workloads fetched in parallel.', type=positive_int, default=conf.DEFAULT_CONCURRENCY)
+    report_parser.set_defaults(func=report)
+
     args = parser.parse_args()
+    cache.configure(enabled=not args.no_cache, refresh=args.refresh_cache)
+    if args.store:
+        import wafr.store as store
+        store.configure(args.store)
+    if args.profile:
+        profiler.enable()
     if hasattr(args, 'func'):
-        args.func(args)
+        try:
+            args.func(args)
+        except (TemplateError, ManifestError, MigrationError, LensError, StoreError, ReportError) as error:
+            parser.exit(1, f'{error}\n')
+        finally:
+            if args.stats:
+                print_request_counters()
+            if args.profile:
+                profiler.write_profile(args.profile)
     else:
         parser.print_help()
         
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid int value: {value!r}')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {number}')
+    return number
+
+def print_request_counters():
+    import wafr.client as client
+    for operation_name, counters in sorted(client.request_counters().items()):
+        print(f"{operation_name}: " + ', '.join(f'{name} {value}' for name, value in counters.items()), file=sys.stderr)
+
 def manage_template(args):
+    if args.from_store and not args.store:
+        sys.exit('--from-store requires --store')
+    if args.all:
+        export_all_workloads(args)
+        return
+    import wafr.template as template
     template.start_generation(
         workload_id=args.workloadid, 
         output_file=args.outputfile, 
         save_workload=args.saveworkload, 
         list_workloads=args.listworkloads, 
-        custom_lens=args.customlens)
+        custom_lens=args.customlens,
+        concurrency=args.concurrency,
+        from_store=args.from_store)
+
+def export_all_workloads(args):
+    import wafr.export as export
+    if not args.outdir:
+        sys.exit('--all requires --outdir')
+    if args.from_store:
+        sys.exit('--from-store can not be used with --all')
+    succeeded = export.export_all_workloads(
+        output_directory=args.outdir,
+        custom_lens=args.customlens,
+        concurrency=args.concurrency)
+    if not succeeded:
+        sys.exit(1)
 
 def create_new_workload(args):
+    import wafr.workload as workload
     workload.create_new_workload(
         template_file_path=args.templatefile,
         workload_name=args.workloadname, 
@@ -74,19 +189,82 @@ def create_new_workload(args):
         regions=args.regions, 
         review_owner=args.reviewowner,
         disable_standard= args.disablestandard,
-        trusted_advisor=args.trustedadvisor)
+        trusted_advisor=args.trustedadvisor,
+        resume=args.resume)
 
 def update_workload(args):
+    import wafr.workload as workload
     workload.update_existing_workload(
         template_file_path=args.templatefile, 
         workload_name=args.workloadname,
-        disable_standard= args.disablestandard)
+        disable_standard= args.disablestandard,
+        only_changes=args.delta,
+        plan=args.plan,
+        concurrency=args.concurrency,
+        resume=args.resume)
+
+def run_fleet(args):
+    import wafr.fleet as fleet
+    succeeded = fleet.run_fleet(
+        manifest_file_path=args.manifest,
+        concurrency=args.concurrency,
+        only_changes=args.delta)
+    if not succeeded:
+        sys.exit(1)
+
+def migrate_workload(args):
+    import wafr.migrate as migrate
+    verified = migrate.migrate_workload(
+        workload_id=args.workloadid,
+        source=(args.source_profile, args.source_region),
+        target=(args.target_profile, args.target_region),
+        workload_name=args.workloadname,
+        concurrency=args.concurrency)
+    if not verified:
+        sys.exit(1)
 
 def publish_lens(args):
+    import wafr.lens as lens
+    if args.dir:
+        succeeded = lens.publish_lenses(
+            lens_directory=args.dir,
+            lens_version=args.lensversion,
+            concurrency=args.concurrency)
+        if not succeeded:
+            sys.exit(1)
+        return
     lens.publish_lens(
         lens_file_path=args.templatepath, 
         lens_version=args.lensversion)
 
+def query(args):
+    import wafr.query as query
+    if not args.store:
+        sys.exit('query requires --store')
+    if args.selected or args.not_selected:
+        query.choice_status(
+            choice_id=args.selected or args.not_selected,
+            selected=bool(args.selected),
+            lens_alias=args.lens)
+    elif args.history:
+        query.workload_history(
+            workload_id=args.history,
+            lens_alias=args.lens or conf.STANDARD_LENS_ALIAS,
+            since=args.since)
+    elif args.snapshots:
+        query.list_snapshots(lens_alias=args.lens)
+    else:
+        query.run_sql(args.sql)
+
+def report(args):
+    import wafr.report as report
+    succeeded = report.generate_report(
+        output_directory=args.outdir,
+        output_format=args.format,
+        concurrency=args.concurrency)
+    if not succeeded:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
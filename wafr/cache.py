@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import config.config as conf
+from wafr.files import atomic_write
+
+settings = {
+    'enabled': True,
+    'refresh': False,
+    'directory': conf.CACHE_DIR
+}
+cache_size = {'bytes': None}
+cache_size_lock = threading.Lock()
+
+
+def configure(enabled=True, refresh=False, directory=conf.CACHE_DIR):
+    settings['enabled'] = enabled
+    settings['refresh'] = refresh
+    settings['directory'] = directory
+    cache_size['bytes'] = None
+
+def scoped_key(client, *parts):
+    profile = getattr(client, 'profile', None) or os.environ.get('AWS_PROFILE', 'default')
+    return '/'.join([profile, client.meta.region_name] + list(parts))
+
+def get(namespace, key, ttl=conf.CACHE_TTL_SECONDS):
+    if not settings['enabled'] or settings['refresh']:
+        return None
+    path = entry_path(namespace, key)
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry['key'] != key or time.time() - entry['created'] > ttl:
+        return None
+    os.utime(path)
+    return entry['value']
+
+def put(namespace, key, value):
+    if not settings['enabled']:
+        return
+    entry = {'key': key, 'created': time.time(), 'value': value}
+    write_entry(entry_path(namespace, key), json.dumps(entry, default=str).encode('utf-8'))
+
+def write_entry(path, content):
+    with atomic_write(path, 'wb') as f:
+        f.write(content)
+    track_size(len(content))
+
+def track_size(written_bytes, max_bytes=conf.CACHE_MAX_BYTES, target_bytes=conf.CACHE_EVICTION_TARGET_BYTES):
+    with cache_size_lock:
+        if cache_size['bytes'] is not None:
+            cache_size['bytes'] += written_bytes
+        if cache_size['bytes'] is None:
+            cache_size['bytes'] = evict(max_bytes)
+        elif cache_size['bytes'] > max_bytes:
+            cache_size['bytes'] = evict(target_bytes)
+
+def invalidate(namespace, key):
+    try:
+        os.remove(entry_path(namespace, key))
+    except FileNotFoundError:
+        pass
+
+def evict(max_bytes=conf.CACHE_MAX_BYTES):
+    entries = []
+    total_bytes = 0
+    for root, _, files in os.walk(settings['directory']):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+    return total_bytes
+
+def entry_path(namespace, key, suffix='.json'):
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(settings['directory'], namespace, digest + suffix)
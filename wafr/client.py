@@ -0,0 +1,116 @@
+import threading
+import uuid
+from contextlib import contextmanager
+
+import config.config as conf
+from wafr.scheduler import RequestScheduler, COUNTER_NAMES
+
+sessions = {}
+clients = {}
+clients_lock = threading.Lock()
+current = threading.local()
+
+
+def get_client():
+    return client_for(current_region(), current_profile())
+
+def client_for(region=None, profile=None):
+    with clients_lock:
+        if (profile, region) not in clients:
+            from botocore.config import Config
+            session = get_session(profile)
+            clients[(profile, region)] = ScheduledClient(session.client(
+                'wellarchitected',
+                region_name=region,
+                config=Config(
+                    max_pool_connections=conf.MAX_POOL_CONNECTIONS,
+                    retries={'total_max_attempts': 1})), session.profile_name)
+        return clients[(profile, region)]
+
+def get_session(profile):
+    if profile not in sessions:
+        import boto3.session
+        sessions[profile] = boto3.session.Session(profile_name=profile)
+    return sessions[profile]
+
+def register_client(service_client, region=None, profile=None):
+    with clients_lock:
+        clients[(profile, region)] = ScheduledClient(service_client, profile)
+        return clients[(profile, region)]
+
+def reset_clients():
+    with clients_lock:
+        clients.clear()
+        sessions.clear()
+
+def request_counters():
+    totals = {}
+    with clients_lock:
+        scheduled_clients = list(clients.values())
+    for scheduled_client in scheduled_clients:
+        with scheduled_client.scheduler.lock:
+            for operation_name, counters in scheduled_client.scheduler.counters.items():
+                operation_totals = totals.setdefault(operation_name, dict.fromkeys(COUNTER_NAMES, 0))
+                for counter_name in COUNTER_NAMES:
+                    operation_totals[counter_name] += counters[counter_name]
+    return totals
+
+def current_region():
+    return getattr(current, 'region', None)
+
+def current_profile():
+    return getattr(current, 'profile', None)
+
+@contextmanager
+def use_region(region):
+    previous_region = current_region()
+    current.region = region
+    try:
+        yield
+    finally:
+        current.region = previous_region
+
+@contextmanager
+def use_profile(profile):
+    previous_profile = current_profile()
+    current.profile = profile
+    try:
+        yield
+    finally:
+        current.profile = previous_profile
+
+@contextmanager
+def use_account(profile, region):
+    with use_profile(profile), use_region(region):
+        yield
+
+def bind(function):
+    region = current_region()
+    profile = current_profile()
+    def run_in_region(*args, **kwargs):
+        with use_account(profile, region):
+            return function(*args, **kwargs)
+    return run_in_region
+
+
+class ScheduledClient:
+
+    def __init__(self, client, profile=None):
+        self.client = client
+        self.meta = client.meta
+        self.profile = profile
+        self.scheduler = RequestScheduler()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if name not in self.meta.method_to_api_mapping:
+            return attribute
+        token_names = self.idempotency_tokens(name)
+        def call(**kwargs):
+            for token_name in token_names:
+                kwargs.setdefault(token_name, str(uuid.uuid4()))
+            return self.scheduler.call(name, attribute, **kwargs)
+        return call
+
+    def idempotency_tokens(self, name):
+        return self.meta.service_model.operation_model(self.meta.method_to_api_mapping[name]).idempotent_members
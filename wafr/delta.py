@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import config.config as conf
+import wafr.client as client
+
+UNSELECTED_STATUS = 'UNSELECTED'
+
+
+def changed_answer_updates(workload_id, answer_updates, lens_alias, concurrency=conf.DEFAULT_CONCURRENCY):
+    changed_updates = []
+    for changed_update, changes in diff_answer_updates(workload_id, answer_updates, lens_alias, concurrency):
+        if changes:
+            changed_updates.append(changed_update)
+    return changed_updates
+
+def diff_answer_updates(workload_id, answer_updates, lens_alias, concurrency=conf.DEFAULT_CONCURRENCY):
+    question_ids = [answer_update['QuestionId'] for answer_update in answer_updates]
+    current_answers = fetch_current_answers(workload_id, question_ids, lens_alias, concurrency)
+    return [diff_answer_update(current_answer, answer_update)
+            for current_answer, answer_update in zip(current_answers, answer_updates)]
+
+def fetch_current_answers(workload_id, question_ids, lens_alias, concurrency=conf.DEFAULT_CONCURRENCY):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(client.bind(lambda question_id: get_current_answer(workload_id, question_id, lens_alias)), question_ids))
+
+def get_current_answer(workload_id, question_id, lens_alias):
+    return client.get_client().get_answer(
+        WorkloadId=workload_id,
+        LensAlias=lens_alias,
+        QuestionId=question_id)['Answer']
+
+def diff_answer_update(current_answer, answer_update):
+    changes = []
+    changed_update = {'QuestionId': answer_update['QuestionId']}
+    if 'IsApplicable' in answer_update and answer_update['IsApplicable'] != current_answer.get('IsApplicable', True):
+        changes.append(f"applicable: {current_answer.get('IsApplicable', True)} -> {answer_update['IsApplicable']}")
+        changed_update['IsApplicable'] = answer_update['IsApplicable']
+    if answer_update['Notes'] != current_answer.get('Notes', ''):
+        changes.append(f"notes: {current_answer.get('Notes', '')!r} -> {answer_update['Notes']!r}")
+    changed_update['Notes'] = answer_update['Notes']
+    current_choices = current_choice_answers(current_answer)
+    choice_updates = {}
+    for choice_id, choice_update in answer_update.get('ChoiceUpdates', {}).items():
+        current_choice = current_choices.get(choice_id, {'Status': UNSELECTED_STATUS})
+        if choice_differs(current_choice, choice_update):
+            changes.append(f"{choice_id}: {describe_choice(current_choice)} -> {describe_choice(choice_update)}")
+            choice_updates[choice_id] = choice_update
+    if choice_updates:
+        changed_update['ChoiceUpdates'] = choice_updates
+    return changed_update, changes
+
+def current_choice_answers(current_answer):
+    current_choices = {choice_id: {'Status': 'SELECTED'} for choice_id in current_answer.get('SelectedChoices', [])}
+    for choice_answer in current_answer.get('ChoiceAnswers', []):
+        current_choices[choice_answer['ChoiceId']] = choice_answer
+    return current_choices
+
+def choice_differs(current_choice, choice_update):
+    for key in choice_update:
+        if current_choice.get(key, '') != choice_update[key]:
+            return True
+    return False
+
+def describe_choice(choice):
+    if 'Reason' in choice:
+        return f"{choice['Status']} ({choice['Reason']}, {choice.get('Notes', '')!r})"
+    return choice['Status']
+
+def print_answer_changes(lens_alias, answer_changes):
+    changed_questions = 0
+    for answer_update, changes in answer_changes:
+        if changes:
+            changed_questions += 1
+            print(f"{lens_alias} {answer_update['QuestionId']}:")
+            for change in changes:
+                print(f"  {change}")
+    print(f"{lens_alias}: {changed_questions} of {len(answer_changes)} marked questions would be updated")
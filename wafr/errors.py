@@ -0,0 +1,22 @@
+class TemplateError(Exception):
+    pass
+
+
+class ManifestError(Exception):
+    pass
+
+
+class MigrationError(Exception):
+    pass
+
+
+class LensError(Exception):
+    pass
+
+
+class StoreError(Exception):
+    pass
+
+
+class ReportError(Exception):
+    pass
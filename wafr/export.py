@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+import config.config as conf
+import wafr.client as client
+import wafr.lens as lens
+import wafr.store as store
+import wafr.template as template
+from wafr.files import atomic_write
+from wafr.paginator import paginate
+
+EXPORT_MANIFEST = '.wafr-export.json'
+
+
+def export_all_workloads(output_directory, custom_lens='', concurrency=conf.DEFAULT_CONCURRENCY):
+    manifest = load_export_manifest(output_directory)
+    lens_alias, _ = template.get_template_lens(custom_lens)
+    lens_summary = lens.get_lens_summary(lens_alias) or {}
+    exported_manifest = {}
+    changed_workloads = []
+    unchanged = 0
+    workloads = [workload for workload in paginate(client.get_client().list_workloads, 'WorkloadSummaries')
+                 if uses_lens(workload, lens_alias, lens_summary)]
+    stored_workloads = None
+    if store.enabled():
+        store.record_workloads(workloads)
+        stored_workloads = store.snapshot_workload_ids(lens_alias)
+    for workload in workloads:
+        state = workload_state(workload, lens_summary)
+        previous_state = manifest.get(workload['WorkloadId'])
+        if (previous_state == state and os.path.exists(os.path.join(output_directory, state['file']))
+                and (stored_workloads is None or workload['WorkloadId'] in stored_workloads)):
+            exported_manifest[workload['WorkloadId']] = previous_state
+            unchanged += 1
+        else:
+            changed_workloads.append((workload, state))
+
+    exported = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        export = client.bind(lambda changed_workload: export_workload(output_directory, *changed_workload, custom_lens, concurrency))
+        for (workload, state), error in zip(changed_workloads, executor.map(export, changed_workloads)):
+            if error:
+                print(f"Failed: {workload['WorkloadName']} ({workload['WorkloadId']}): {error}", file=sys.stderr)
+                if workload['WorkloadId'] in manifest:
+                    exported_manifest[workload['WorkloadId']] = manifest[workload['WorkloadId']]
+                failed += 1
+            else:
+                print(f"Exported: {workload['WorkloadName']} ({workload['WorkloadId']}) to {state['file']}")
+                exported_manifest[workload['WorkloadId']] = state
+                exported += 1
+    write_export_manifest(output_directory, exported_manifest)
+    print(f'Workloads exported: {exported}, unchanged: {unchanged}, failed: {failed}')
+    return failed == 0
+
+def uses_lens(workload, lens_alias, lens_summary):
+    lenses = workload.get('Lenses')
+    return lenses is None or lens_alias in lenses or lens_summary.get('LensArn') in lenses
+
+def workload_state(workload, lens_summary):
+    return {
+        'name': workload['WorkloadName'],
+        'updated_at': str(workload.get('UpdatedAt', '')),
+        'lenses': sorted(workload.get('Lenses', [])),
+        'lens_version': lens_summary.get('LensVersion', ''),
+        'file': f"{workload['WorkloadId']}.yaml"
+    }
+
+def export_workload(output_directory, workload, state, custom_lens, concurrency):
+    try:
+        lines = template.generate_new_template(workload['WorkloadId'], True, custom_lens, concurrency)
+        template.write_template(os.path.join(output_directory, state['file']), lines)
+    except (BotoCoreError, ClientError, OSError) as error:
+        return str(error)
+    return None
+
+def load_export_manifest(output_directory):
+    try:
+        with open(os.path.join(output_directory, EXPORT_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_export_manifest(output_directory, manifest):
+    with atomic_write(os.path.join(output_directory, EXPORT_MANIFEST)) as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
@@ -0,0 +1,150 @@
+import csv
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from botocore.exceptions import BotoCoreError, ClientError
+
+import config.config as conf
+import wafr.client as client
+import wafr.lens as lens
+import wafr.workload as workload
+from wafr.errors import ManifestError
+from wafr.output import print_table
+
+MANIFEST_FIELDS = ['name', 'description', 'environment', 'account_ids', 'regions', 'template', 'lens', 'owner',
+                   'region', 'disable_standard', 'trusted_advisor']
+REQUIRED_FIELDS = ['name', 'description', 'environment', 'template', 'owner']
+LIST_FIELDS = ['account_ids', 'regions']
+ENVIRONMENTS = ['prod', 'pre-prod']
+TRUE_VALUES = ['true', 'yes', 'y', '1']
+RESULT_COLUMNS = [('name', 'NAME'), ('region', 'REGION'), ('action', 'ACTION'), ('workload_id', 'WORKLOAD ID'),
+                  ('updates', 'UPDATES'), ('error', 'ERROR')]
+
+
+def run_fleet(manifest_file_path, concurrency=conf.DEFAULT_CONCURRENCY, only_changes=False):
+    entries = load_manifest(manifest_file_path)
+    templates = load_templates(entries)
+    progress = Progress(len(entries))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(apply_entry, entry, templates, only_changes, progress) for entry in entries]
+        results = [future.result() for future in futures]
+    print_results(results)
+    return all(not result['error'] for result in results)
+
+def load_manifest(manifest_file_path):
+    with open(manifest_file_path, newline='') as f:
+        if manifest_file_path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = yaml.safe_load(f)
+    if isinstance(rows, dict):
+        rows = rows.get('workloads')
+    if not isinstance(rows, list) or not rows:
+        raise ManifestError(f'{manifest_file_path}: the manifest must contain a list of workloads')
+    entries = [normalize_entry(row, f'{manifest_file_path}: row {index}') for index, row in enumerate(rows, start=1)]
+    check_duplicate_entries(entries, manifest_file_path)
+    return entries
+
+def check_duplicate_entries(entries, manifest_file_path):
+    default_region = client.get_client().meta.region_name if any(not entry['region'] for entry in entries) else None
+    rows = {}
+    for index, entry in enumerate(entries, start=1):
+        key = (entry['name'], entry['region'] or default_region)
+        if key in rows:
+            raise ManifestError(f"{manifest_file_path}: row {index}: the workload {key[0]} in region {key[1]} is already defined in row {rows[key]}")
+        rows[key] = index
+
+def normalize_entry(row, location):
+    if not isinstance(row, dict):
+        raise ManifestError(f'{location}: a workload must be a mapping of {", ".join(MANIFEST_FIELDS)}')
+    unknown_fields = [field for field in row if field not in MANIFEST_FIELDS]
+    if unknown_fields:
+        raise ManifestError(f'{location}: unknown fields {", ".join(unknown_fields)}')
+    missing_fields = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing_fields:
+        raise ManifestError(f'{location}: missing fields {", ".join(missing_fields)}')
+    entry = {field: row.get(field) or None for field in MANIFEST_FIELDS}
+    for field in LIST_FIELDS:
+        entry[field] = list_value(entry[field])
+    if not entry['regions']:
+        entry['regions'] = ['eu-central-1']
+    if entry['environment'] not in ENVIRONMENTS:
+        raise ManifestError(f"{location}: environment must be one of {', '.join(ENVIRONMENTS)}")
+    entry['disable_standard'] = str(entry['disable_standard']).lower() in TRUE_VALUES
+    return entry
+
+def list_value(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [item for item in re.split(r'[;,\s]+', str(value)) if item]
+
+def load_templates(entries):
+    templates = {}
+    for entry in entries:
+        if entry['template'] not in templates:
+            templates[entry['template']] = workload.get_template_content(entry['template'])
+    if any(entry['disable_standard'] for entry in entries):
+        templates[workload.STANDARD_TEMPLATE_PATH] = workload.get_template_content(workload.STANDARD_TEMPLATE_PATH)
+    return templates
+
+def apply_entry(entry, templates, only_changes, progress):
+    result = {'name': entry['name'], 'region': entry['region'] or '-', 'action': '', 'workload_id': '', 'updates': 0, 'error': ''}
+    try:
+        with client.use_region(entry['region']):
+            apply_workload(entry, templates, only_changes, result)
+    except (BotoCoreError, ClientError) as error:
+        result['error'] = str(error)
+    progress.done(result)
+    return result
+
+def apply_workload(entry, templates, only_changes, result):
+    template = templates[entry['template']]
+    lens_alias = lens.get_lens_alias(entry['lens'] or template.lens)
+    if not lens_alias:
+        result['error'] = f"lens {entry['lens'] or template.lens} is not published"
+        return
+    disable_standard = workload.disabling_standard_lens(entry['disable_standard'], lens_alias)
+    workload_id = workload.get_workload_id(entry['name'])
+    if workload_id is None:
+        workload_id = workload.create_workload(entry['name'], entry['description'], entry['environment'], entry['account_ids'],
+                                               entry['regions'], entry['owner'], lens_alias, entry['trusted_advisor'])
+        result['action'] = 'created'
+        result['workload_id'] = workload_id
+        if disable_standard:
+            result['updates'] += workload.mark_standard_questions_not_applicable(workload_id, templates[workload.STANDARD_TEMPLATE_PATH])[1]
+        result['updates'] += workload.mark_answers(workload_id, template, lens_alias)[1]
+    else:
+        result['action'] = 'updated'
+        result['workload_id'] = workload_id
+        if workload.adding_new_lens(workload_id, lens_alias):
+            workload.associate_new_lens(workload_id, lens_alias)
+        result['updates'] += workload.mark_answers(workload_id, template, lens_alias, only_changes)[1]
+        if disable_standard:
+            result['updates'] += workload.mark_standard_questions_not_applicable(workload_id, templates[workload.STANDARD_TEMPLATE_PATH], only_changes)[1]
+
+def print_results(results):
+    print_table([header for _, header in RESULT_COLUMNS], [[result[key] for key, _ in RESULT_COLUMNS] for result in results])
+    failed = sum(1 for result in results if result['error'])
+    print(f'Workloads processed: {len(results)}, failed: {failed}')
+
+
+class Progress:
+
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def done(self, result):
+        with self.lock:
+            self.completed += 1
+            if result['error']:
+                self.failed += 1
+            status = 'failed' if result['error'] else result['action']
+            print(f"[{self.completed}/{self.total}] {result['name']}: {status} (failed so far: {self.failed})", file=sys.stderr, flush=True)
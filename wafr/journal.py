@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+
+import config.config as conf
+from wafr.files import atomic_write
+
+WORKLOAD_EVENT = 'workload'
+ANSWER_EVENT = 'answer'
+
+
+class Journal:
+
+    def __init__(self, path, entries):
+        self.path = path
+        self.lock = threading.Lock()
+        self.workload_id = None
+        self.completed_answers = set()
+        for entry in entries:
+            self.apply(entry)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def apply(self, entry):
+        if entry['event'] == WORKLOAD_EVENT:
+            self.workload_id = entry['workload_id']
+        elif entry['event'] == ANSWER_EVENT:
+            self.completed_answers.add((entry['lens_alias'], entry['question_id'], entry['update']))
+
+    def append(self, entry):
+        with self.lock:
+            self.apply(entry)
+            self.file.write(json.dumps(entry, sort_keys=True) + '\n')
+            self.file.flush()
+
+    def record_workload(self, workload_id):
+        self.append({'event': WORKLOAD_EVENT, 'workload_id': workload_id})
+
+    def record_answer(self, lens_alias, answer_update):
+        self.append({'event': ANSWER_EVENT, 'lens_alias': lens_alias, 'question_id': answer_update['QuestionId'], 'update': content_hash(answer_update)})
+
+    def completed(self, lens_alias, answer_update):
+        return (lens_alias, answer_update['QuestionId'], content_hash(answer_update)) in self.completed_answers
+
+    def remaining_updates(self, lens_alias, answer_updates):
+        remaining_updates = [answer_update for answer_update in answer_updates if not self.completed(lens_alias, answer_update)]
+        if len(remaining_updates) < len(answer_updates):
+            print(f'{lens_alias}: skipping {len(answer_updates) - len(remaining_updates)} answer updates completed by the previous run')
+        return remaining_updates
+
+    def finish(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+def open_journal(command, scope, inputs, resume=False):
+    path = journal_path(command, scope, inputs)
+    entries = read_entries(path)
+    if resume and not entries:
+        print(f'No previous {command} run with the same inputs was found. Starting from the beginning.')
+    elif not resume and entries:
+        print(f'The previous {command} run with the same inputs did not finish, use --resume to continue it. Starting from the beginning.')
+    if not resume:
+        entries = []
+    with atomic_write(path) as f:
+        f.writelines(json.dumps(entry, sort_keys=True) + '\n' for entry in entries)
+    return Journal(path, entries)
+
+def journal_path(command, scope, inputs):
+    return os.path.join(conf.JOURNAL_DIR, f'{command}-{content_hash([scope, inputs])[:24]}.jsonl')
+
+def read_entries(path):
+    entries = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+    except OSError:
+        pass
+    return entries
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def content_hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def request_token(*inputs):
+    return content_hash(list(inputs))
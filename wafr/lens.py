@@ -1,46 +1,229 @@
-import boto3
+import glob
+import hashlib
 import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
 import config.config as conf
+import wafr.cache as cache
+import wafr.client as client
+from wafr.errors import LensError
+from wafr.paginator import paginate, NameIndex
 
-well_architected_tool_client = boto3.client('wellarchitected')
+lens_summaries = {}
+lens_indexes = {}
+lens_index_cached = {}
+lens_lock = threading.RLock()
+output_lock = threading.Lock()
+
+LENS_SUMMARIES_CACHE = 'lens-summaries'
+LENS_SUMMARY_KEYS = ['LensArn', 'LensAlias', 'LensName', 'LensType', 'LensVersion', 'LensStatus']
+LENS_CONTENT_CACHE = 'lens-contents'
+LENS_KEYS = ['schemaVersion', 'name', 'description', 'pillars']
+PILLAR_KEYS = ['id', 'name', 'questions']
+QUESTION_KEYS = ['id', 'title', 'choices', 'riskRules']
+CHOICE_KEYS = ['id', 'title', 'improvementPlan']
+RISKS = ['NO_RISK', 'MEDIUM_RISK', 'HIGH_RISK']
 
 def publish_lens(lens_file_path, lens_version):
-    lens_alias = import_lens(lens_file_path)
-    print(f'Publishing lens alias {lens_alias} with version {lens_version}')
-    well_architected_tool_client.create_lens_version(        
+    lens_template = load_template(lens_file_path)
+    get_lens_index(refresh=True)
+    if publish_lens_template(lens_template, lens_version):
+        invalidate_lens_summaries()
+
+def publish_lenses(lens_directory, lens_version, concurrency=conf.DEFAULT_CONCURRENCY):
+    lens_templates = load_lens_directory(lens_directory)
+    get_lens_index(refresh=True)
+    published = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        publish = client.bind(lambda lens_template: publish_lens_safely(lens_template, lens_version))
+        for lens_file_path, (lens_published, error) in zip(lens_templates, executor.map(publish, lens_templates.values())):
+            if error:
+                report(f'Failed to publish {lens_file_path}: {error}', file=sys.stderr)
+                failed += 1
+            elif lens_published:
+                published += 1
+    if published or failed:
+        invalidate_lens_summaries()
+    print(f'Lenses published: {published}, unchanged: {len(lens_templates) - published - failed}, failed: {failed}')
+    return failed == 0
+
+def publish_lens_safely(lens_template, lens_version):
+    try:
+        return publish_lens_template(lens_template, lens_version), None
+    except (BotoCoreError, ClientError) as error:
+        return False, str(error)
+
+def publish_lens_template(lens_template, lens_version):
+    lens_name = get_lens_name(lens_template)
+    content_hash = lens_content_hash(lens_template)
+    lens_alias = get_lens_alias(lens_name)
+    if lens_alias:
+        lens_summary = get_lens_summary(lens_alias) or {}
+        published_version = lens_summary.get('LensVersion')
+        if published_version and published_lens_hash(lens_alias, published_version) == content_hash:
+            report(f'Lens {lens_name} is unchanged since version {published_version}, nothing to publish')
+            return False
+        import_lens(lens_template, lens_name, lens_alias)
+    else:
+        lens_alias = import_lens(lens_template, lens_name)
+    report(f'Publishing lens alias {lens_alias} with version {lens_version}')
+    client.get_client().create_lens_version(        
         LensAlias=lens_alias,
         LensVersion=lens_version
     )
+    cache.put(LENS_CONTENT_CACHE, lens_content_key(lens_alias, lens_version), content_hash)
+    return True
 
-def import_lens(lens_file_path):
-    lens_temlate = load_template(lens_file_path)
-    lens_name = get_lens_name(lens_temlate)
-    print(f'Importing lens with name: {lens_name}')
-    lens_alias = get_lens_alias(lens_name)
+def import_lens(lens_template, lens_name, lens_alias=None):
+    report(f'Importing lens with name: {lens_name}')
     if lens_alias:
-        well_architected_tool_client.import_lens(
+        client.get_client().import_lens(
             LensAlias=lens_alias,
-            JSONString=json.dumps(lens_temlate)
+            JSONString=json.dumps(lens_template)
         )
     else:
-        lens_alias = well_architected_tool_client.import_lens(
-            JSONString=json.dumps(lens_temlate)
+        lens_alias = client.get_client().import_lens(
+            JSONString=json.dumps(lens_template)
         )['LensArn']
+        get_lens_index().add(lens_name, lens_alias)
     return lens_alias
 
+def published_lens_hash(lens_alias, lens_version):
+    cache_key = lens_content_key(lens_alias, lens_version)
+    content_hash = cache.get(LENS_CONTENT_CACHE, cache_key)
+    if content_hash is None:
+        try:
+            exported_lens = client.get_client().export_lens(LensAlias=lens_alias, LensVersion=lens_version)['LensJSON']
+        except ClientError:
+            return None
+        content_hash = lens_content_hash(json.loads(exported_lens))
+        cache.put(LENS_CONTENT_CACHE, cache_key, content_hash)
+    return content_hash
+
+def report(message, file=None):
+    with output_lock:
+        print(message, file=file or sys.stdout, flush=True)
+
+def lens_content_key(lens_alias, lens_version):
+    return cache.scoped_key(client.get_client(), lens_alias, lens_version)
+
+def lens_content_hash(lens_template):
+    canonical_json = json.dumps(lens_template, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical_json.encode('utf-8')).hexdigest()
+
 def load_template(lens_file_path):
     with open(lens_file_path) as f:
         json_content = json.load(f)
     return json_content
 
+def load_lens_directory(lens_directory):
+    lens_templates = {}
+    errors = []
+    for lens_file_path in sorted(glob.glob(os.path.join(lens_directory, '*.json'))):
+        try:
+            lens_templates[lens_file_path] = load_template(lens_file_path)
+        except (OSError, ValueError) as error:
+            errors.append(f'{lens_file_path}: {error}')
+            continue
+        errors.extend(f'{lens_file_path}: {error}' for error in validate_lens(lens_templates[lens_file_path]))
+    lens_names = {}
+    for lens_file_path, lens_template in lens_templates.items():
+        if isinstance(lens_template, dict) and lens_template.get('name') in lens_names:
+            errors.append(f"{lens_file_path}: the lens name {lens_template['name']} is also used by {lens_names[lens_template['name']]}")
+        elif isinstance(lens_template, dict):
+            lens_names[lens_template.get('name')] = lens_file_path
+    if not lens_templates and not errors:
+        errors.append(f'{lens_directory}: no lens files found')
+    if errors:
+        raise LensError('\n'.join(errors))
+    return lens_templates
+
+def validate_lens(lens_template):
+    if not isinstance(lens_template, dict):
+        return ['the lens must be a JSON object']
+    errors = [f'missing {key}' for key in LENS_KEYS if not lens_template.get(key)]
+    pillars = lens_template.get('pillars') or []
+    question_ids = set()
+    for pillar in listed(pillars, 'pillars', errors):
+        errors.extend(f"pillar {pillar.get('id')}: missing {key}" for key in PILLAR_KEYS if not pillar.get(key))
+        for question in listed(pillar.get('questions', []), f"pillar {pillar.get('id')} questions", errors):
+            location = f"question {question.get('id')}"
+            errors.extend(f'{location}: missing {key}' for key in QUESTION_KEYS if not question.get(key))
+            if question.get('id') in question_ids:
+                errors.append(f'{location}: duplicated question id')
+            question_ids.add(question.get('id'))
+            choice_ids = set()
+            for choice in listed(question.get('choices', []), f'{location} choices', errors):
+                errors.extend(f"{location}: choice {choice.get('id')}: missing {key}" for key in CHOICE_KEYS if not choice.get(key))
+                if choice.get('id') in choice_ids:
+                    errors.append(f"{location}: duplicated choice id {choice.get('id')}")
+                choice_ids.add(choice.get('id'))
+            for risk_rule in listed(question.get('riskRules', []), f'{location} riskRules', errors):
+                if risk_rule.get('risk') not in RISKS:
+                    errors.append(f"{location}: unknown risk {risk_rule.get('risk')}, expected one of {', '.join(RISKS)}")
+    return errors
+
+def listed(items, location, errors):
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        errors.append(f'{location} must be a list of objects')
+        return []
+    return items
+
 def get_lens_alias(lens_name):
     if lens_name == conf.STANDARD_LENS_ALIAS:
         return lens_name
-    lenses = well_architected_tool_client.list_lenses()
-    for lens in lenses['LensSummaries']:
-        if lens['LensName'] == lens_name:
-            return lens['LensArn']
+    lens_alias = get_lens_index().get(lens_name)
+    if lens_alias is None and lens_index_cached.get(lens_scope()):
+        lens_alias = get_lens_index(refresh=True).get(lens_name)
+    return lens_alias
+
+def get_lens_summary(lens_alias):
+    for lens_summary in get_lens_summaries():
+        if lens_alias in (lens_summary.get('LensAlias'), lens_summary.get('LensArn')):
+            return lens_summary
     return None
 
+def get_workload_lens_version(workload_id, lens_alias):
+    return client.get_client().get_lens_review(WorkloadId=workload_id, LensAlias=lens_alias)['LensReview'].get('LensVersion', '')
+
+def get_lens_index(refresh=False):
+    scope = lens_scope()
+    with lens_lock:
+        if scope not in lens_indexes or refresh:
+            summaries = get_lens_summaries(refresh)
+            lens_indexes[scope] = NameIndex(lambda: summaries, name_key='LensName', id_key='LensArn')
+        return lens_indexes[scope]
+
+def get_lens_summaries(refresh=False):
+    scope = lens_scope()
+    with lens_lock:
+        if scope in lens_summaries and not refresh:
+            return lens_summaries[scope]
+        summaries = None if refresh else cache.get(LENS_SUMMARIES_CACHE, scope)
+        lens_index_cached[scope] = summaries is not None
+        if summaries is None:
+            summaries = [{key: lens_summary[key] for key in LENS_SUMMARY_KEYS if key in lens_summary}
+                         for lens_summary in list_lenses()]
+            cache.put(LENS_SUMMARIES_CACHE, scope, summaries)
+        lens_summaries[scope] = summaries
+        return summaries
+
+def invalidate_lens_summaries():
+    scope = lens_scope()
+    with lens_lock:
+        lens_summaries.pop(scope, None)
+    cache.invalidate(LENS_SUMMARIES_CACHE, scope)
+
+def lens_scope():
+    return cache.scoped_key(client.get_client())
+
+def list_lenses():
+    return paginate(client.get_client().list_lenses, 'LensSummaries')
+
 def get_lens_name(template):
     return template['name']
\ No newline at end of file
@@ -0,0 +1,148 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import config.config as conf
+import wafr.client as client
+import wafr.delta as delta
+import wafr.journal as journal
+import wafr.lens as lens
+import wafr.template as template
+import wafr.workload as workload
+from wafr.errors import MigrationError
+
+WORKLOAD_FIELDS = ['Description', 'Environment', 'AccountIds', 'AwsRegions', 'NonAwsRegions', 'PillarPriorities', 'ArchitecturalDesign',
+                   'ReviewOwner', 'IndustryType', 'Industry', 'Notes', 'Tags', 'DiscoveryConfig']
+QUEUE_SIZE_PER_WORKER = 4
+UNSELECTED_STATUS = 'UNSELECTED'
+
+
+def migrate_workload(workload_id, source, target, workload_name='', concurrency=conf.DEFAULT_CONCURRENCY):
+    with client.use_account(*source):
+        source_workload = client.get_client().get_workload(WorkloadId=workload_id)['Workload']
+        lens_names = {lens_alias: source_lens_name(lens_alias) for lens_alias in source_workload['Lenses']}
+    workload_name = workload_name or source_workload['WorkloadName']
+    with client.use_account(*target):
+        lens_aliases = {source_alias: target_lens_alias(source_alias, lens_name) for source_alias, lens_name in lens_names.items()}
+        target_workload_id, created = create_or_reuse_workload(source_workload, workload_name, list(lens_aliases.values()))
+    print(f"{'Created' if created else 'Updating existing'} workload {workload_name} ({target_workload_id})")
+    copied_updates = {}
+    for source_alias, target_alias in lens_aliases.items():
+        copied_updates[target_alias] = copy_lens_answers(workload_id, source_alias, target_workload_id, target_alias, source, target, created, concurrency)
+        print(f'{target_alias}: {len(copied_updates[target_alias])} answers copied')
+    return verify_migration(target_workload_id, copied_updates, target, concurrency)
+
+def source_lens_name(lens_alias):
+    if not lens_alias.startswith('arn:'):
+        return None
+    lens_summary = lens.get_lens_summary(lens_alias)
+    if lens_summary is None:
+        raise MigrationError(f'The lens {lens_alias} of the source workload can not be found.')
+    return lens_summary['LensName']
+
+def target_lens_alias(source_alias, lens_name):
+    if lens_name is None:
+        return source_alias
+    lens_alias = lens.get_lens_alias(lens_name)
+    if not lens_alias:
+        raise MigrationError(f'The lens {lens_name} does not exist in the target account. Please publish first the lens and then migrate the workload.')
+    return lens_alias
+
+def create_or_reuse_workload(source_workload, workload_name, lens_aliases):
+    workload_id = workload.get_workload_id(workload_name)
+    if workload_id:
+        workload_lenses = client.get_client().get_workload(WorkloadId=workload_id)['Workload']['Lenses']
+        missing_lenses = [lens_alias for lens_alias in lens_aliases if lens_alias not in workload_lenses]
+        if missing_lenses:
+            client.get_client().associate_lenses(WorkloadId=workload_id, LensAliases=missing_lenses)
+        return workload_id, False
+    workload_fields = {key: source_workload[key] for key in WORKLOAD_FIELDS if source_workload.get(key)}
+    workload_id = client.get_client().create_workload(
+        WorkloadName=workload_name,
+        Lenses=lens_aliases,
+        ClientRequestToken=journal.request_token(workload_name, source_workload['WorkloadId'], lens_aliases),
+        **workload_fields
+    )['WorkloadId']
+    workload.get_workload_index().add(workload_name, workload_id)
+    return workload_id, True
+
+def copy_lens_answers(source_workload_id, source_alias, target_workload_id, target_alias, source, target, new_workload, concurrency):
+    answer_updates = queue.Queue(maxsize=concurrency * QUEUE_SIZE_PER_WORKER)
+    errors = []
+    copied_updates = []
+    with ThreadPoolExecutor(max_workers=concurrency) as consumers:
+        with client.use_account(*target):
+            for _ in range(concurrency):
+                consumers.submit(client.bind(apply_answer_updates), answer_updates, target_workload_id, target_alias, errors)
+        try:
+            with client.use_account(*source), ThreadPoolExecutor(max_workers=concurrency) as producers:
+                window = concurrency * template.ANSWER_WINDOW_PER_WORKER
+                for _, question, answer in template.stream_workload_answers(producers, source_workload_id, source_alias, window):
+                    if question is None:
+                        continue
+                    answer_update = migrated_answer_update(question, answer, new_workload)
+                    if answer_update:
+                        answer_updates.put(answer_update)
+                        copied_updates.append(answer_update)
+        finally:
+            for _ in range(concurrency):
+                answer_updates.put(None)
+    if errors:
+        raise MigrationError(f'{target_alias}: {len(errors)} answer updates failed, the first one: {errors[0]}')
+    return copied_updates
+
+def apply_answer_updates(answer_updates, workload_id, lens_alias, errors):
+    while True:
+        answer_update = answer_updates.get()
+        if answer_update is None:
+            return
+        try:
+            client.get_client().update_answer(WorkloadId=workload_id, LensAlias=lens_alias, **answer_update)
+        except Exception as error:
+            errors.append(f"{answer_update['QuestionId']}: {error}")
+
+def migrated_answer_update(question, answer, new_workload):
+    answer_update = {
+        'QuestionId': question['QuestionId'],
+        'IsApplicable': answer.get('IsApplicable', True),
+        'Notes': answer.get('Notes', '')
+    }
+    if not answer_update['IsApplicable']:
+        if answer.get('Reason'):
+            answer_update['Reason'] = answer['Reason']
+        return answer_update
+    choice_updates = migrated_choice_updates(question, answer, new_workload)
+    if choice_updates:
+        answer_update['ChoiceUpdates'] = choice_updates
+    elif new_workload and not answer_update['Notes']:
+        return None
+    return answer_update
+
+def migrated_choice_updates(question, answer, new_workload):
+    choice_answers = delta.current_choice_answers(answer)
+    choice_updates = {}
+    for choice in question['Choices']:
+        choice_answer = choice_answers.get(choice['ChoiceId'], {'Status': UNSELECTED_STATUS})
+        choice_update = {'Status': choice_answer['Status']}
+        if choice_answer['Status'] == 'NOT_APPLICABLE' and choice_answer.get('Reason'):
+            choice_update['Reason'] = choice_answer['Reason']
+        if choice_answer.get('Notes'):
+            choice_update['Notes'] = choice_answer['Notes']
+        if not new_workload or choice_update != {'Status': UNSELECTED_STATUS}:
+            choice_updates[choice['ChoiceId']] = choice_update
+    return choice_updates
+
+def verify_migration(workload_id, copied_updates, target, concurrency):
+    verified = True
+    with client.use_account(*target):
+        workload_lenses = client.get_client().get_workload(WorkloadId=workload_id)['Workload']['Lenses']
+        for lens_alias, answer_updates in copied_updates.items():
+            if lens_alias not in workload_lenses:
+                print(f'{lens_alias}: the lens is not associated with the migrated workload')
+                verified = False
+            answer_changes = delta.diff_answer_updates(workload_id, answer_updates, lens_alias, concurrency)
+            differing = [(answer_update, changes) for answer_update, changes in answer_changes if changes]
+            for answer_update, changes in differing:
+                print(f"{lens_alias} {answer_update['QuestionId']} differs from the source: {'; '.join(changes)}")
+            print(f'{lens_alias}: {len(answer_changes) - len(differing)} of {len(answer_changes)} copied answers verified')
+            verified = verified and not differing
+    return verified
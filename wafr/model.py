@@ -0,0 +1,166 @@
+import hashlib
+
+import yaml
+
+import config.config as conf
+import wafr.cache as cache
+import wafr.profiler as profiler
+from wafr.errors import TemplateError
+
+TEMPLATE_CACHE = 'templates'
+MODEL_VERSION = '2'
+CHOICE_STATUSES = ['SELECTED', 'UNSELECTED', 'NOT_APPLICABLE']
+TEMPLATE_ENCODINGS = ['utf-8', 'cp1252']
+
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+loaded_templates = {}
+
+
+class Choice:
+    __slots__ = ('id', 'title', 'status', 'reason', 'notes')
+
+    def __init__(self, id, title='', status=None, reason=None, notes=''):
+        self.id = id
+        self.title = title
+        self.status = status
+        self.reason = reason
+        self.notes = notes
+
+
+class Question:
+    __slots__ = ('label', 'question_id', 'title', 'notes', 'not_applicable', 'answers')
+
+    def __init__(self, question_id, label='', title='', notes='', not_applicable=False, answers=()):
+        self.question_id = question_id
+        self.label = label
+        self.title = title
+        self.notes = notes
+        self.not_applicable = not_applicable
+        self.answers = answers
+
+
+class Pillar:
+    __slots__ = ('pillar_id', 'questions')
+
+    def __init__(self, pillar_id, questions):
+        self.pillar_id = pillar_id
+        self.questions = questions
+
+
+class Template:
+    __slots__ = ('lens', 'pillars')
+
+    def __init__(self, lens, pillars):
+        self.lens = lens
+        self.pillars = pillars
+
+    def questions(self):
+        for pillar in self.pillars:
+            yield from pillar.questions
+
+
+def load_template(template_file_path):
+    with profiler.phase('template-load'):
+        return load_template_file(template_file_path)
+
+def load_template_file(template_file_path):
+    with open(template_file_path, 'rb') as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    if content_hash in loaded_templates:
+        return loaded_templates[content_hash]
+    cache_key = f'{MODEL_VERSION}/{content_hash}'
+    template = cached_template(cache_key)
+    if template is None:
+        template = compile_template(parse_yaml(content, template_file_path), template_file_path)
+        cache.put(TEMPLATE_CACHE, cache_key, template_values_of(template))
+    loaded_templates[content_hash] = template
+    return template
+
+def cached_template(cache_key):
+    template_values = cache.get(TEMPLATE_CACHE, cache_key)
+    if template_values is None:
+        return None
+    try:
+        return template_from_values(template_values)
+    except (TypeError, ValueError):
+        return None
+
+def template_values_of(template):
+    return [template.lens, [[pillar.pillar_id, [question_values_of(question) for question in pillar.questions]] for pillar in template.pillars]]
+
+def question_values_of(question):
+    return [question.question_id, question.label, question.title, question.notes, question.not_applicable,
+            [[choice.id, choice.title, choice.status, choice.reason, choice.notes] for choice in question.answers]]
+
+def template_from_values(template_values):
+    lens, pillars = template_values
+    return Template(lens, tuple(Pillar(pillar_id, tuple(question_from_values(*question) for question in questions)) for pillar_id, questions in pillars))
+
+def question_from_values(question_id, label, title, notes, not_applicable, answers):
+    return Question(question_id, label, title, notes, not_applicable, tuple(Choice(*choice) for choice in answers))
+
+def parse_yaml(content, template_file_path):
+    try:
+        with profiler.phase('yaml-parse'):
+            return yaml.load(decode_template(content, template_file_path), Loader=YamlLoader)
+    except yaml.YAMLError as error:
+        raise TemplateError(f'{template_file_path}: invalid YAML: {error}')
+
+def decode_template(content, template_file_path):
+    for encoding in TEMPLATE_ENCODINGS:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    raise TemplateError(f'{template_file_path}: unsupported file encoding')
+
+def compile_template(content, template_file_path):
+    if not isinstance(content, dict) or not isinstance(content.get(conf.LENS_KEY), str):
+        raise TemplateError(f"{template_file_path}: the template must start with a '{conf.LENS_KEY}' entry")
+    pillars = []
+    for pillar_id, questions in content.items():
+        if pillar_id == conf.LENS_KEY:
+            continue
+        location = f'{template_file_path}: {pillar_id}'
+        if not isinstance(questions, list):
+            raise TemplateError(f'{location}: a pillar must contain a list of questions')
+        pillars.append(Pillar(pillar_id, tuple(compile_question(question, location) for question in questions)))
+    return Template(content[conf.LENS_KEY], tuple(pillars))
+
+def compile_question(question, location):
+    if not isinstance(question, dict) or 'question_id' not in question:
+        raise TemplateError(f'{location}: every question must have a question_id')
+    location = f"{location}: {question['question_id']}"
+    not_applicable = bool(question.get('not_applicable', False))
+    answers = question.get('answers') or []
+    if not not_applicable and not isinstance(question.get('answers'), list):
+        raise TemplateError(f'{location}: the question must have answers or must be marked as not_applicable')
+    return Question(
+        question_id=question['question_id'],
+        label=str(question.get('label', '')),
+        title=str(question.get('title', '')),
+        notes=text_value(question.get('notes')),
+        not_applicable=not_applicable,
+        answers=tuple(compile_choice(answer, location) for answer in answers))
+
+def compile_choice(answer, location):
+    if not isinstance(answer, dict) or 'id' not in answer:
+        raise TemplateError(f'{location}: every answer must have an id')
+    status = answer.get('status')
+    if status is not None and status not in CHOICE_STATUSES:
+        raise TemplateError(f"{location}: {answer['id']}: unknown status {status}, expected one of {', '.join(CHOICE_STATUSES)}")
+    if status == 'NOT_APPLICABLE' and 'reason' not in answer:
+        raise TemplateError(f"{location}: {answer['id']}: a NOT_APPLICABLE answer must have a reason")
+    return Choice(
+        id=answer['id'],
+        title=str(answer.get('title', '')),
+        status=status,
+        reason=answer.get('reason'),
+        notes=text_value(answer.get('notes')))
+
+def text_value(value):
+    if value is None:
+        return ''
+    return str(value)
@@ -0,0 +1,5 @@
+def print_table(headers, rows):
+    rows = [['' if value is None else str(value) for value in row] for row in rows]
+    widths = [max(len(value) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
@@ -0,0 +1,44 @@
+import threading
+
+MAX_PAGE_SIZE = 50
+
+
+def paginate(operation, result_key, **kwargs):
+    kwargs.setdefault('MaxResults', MAX_PAGE_SIZE)
+    while True:
+        page = operation(**kwargs)
+        yield from page[result_key]
+        if not page.get('NextToken'):
+            return
+        kwargs['NextToken'] = page['NextToken']
+
+
+class NameIndex:
+
+    def __init__(self, list_items, name_key, id_key):
+        self.list_items = list_items
+        self.items = None
+        self.name_key = name_key
+        self.id_key = id_key
+        self.ids = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            if name in self.ids:
+                return self.ids[name]
+            if self.items is None:
+                self.items = iter(self.list_items())
+            try:
+                for item in self.items:
+                    self.ids.setdefault(item[self.name_key], item[self.id_key])
+                    if item[self.name_key] == name:
+                        return item[self.id_key]
+            except Exception:
+                self.items = None
+                raise
+            return None
+
+    def add(self, name, item_id):
+        with self.lock:
+            self.ids[name] = item_id
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PERCENTILES = [50, 95, 99]
+
+settings = {'enabled': False}
+events = []
+events_lock = threading.Lock()
+profile_started = time.perf_counter()
+
+
+class ApiCall:
+    __slots__ = ('name', 'request', 'retries', 'response', 'error')
+
+    def __init__(self, name, request):
+        self.name = name
+        self.request = request
+        self.retries = 0
+        self.response = None
+        self.error = None
+
+
+def enable():
+    global profile_started
+    settings['enabled'] = True
+    profile_started = time.perf_counter()
+
+def enabled():
+    return settings['enabled']
+
+@contextmanager
+def api_call(operation_name, request):
+    call = ApiCall(operation_name, request)
+    if not settings['enabled']:
+        yield call
+        return
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as error:
+        call.error = type(error).__name__
+        raise
+    finally:
+        record('api', operation_name, started, time.perf_counter(), {
+            'retries': call.retries,
+            'request_bytes': payload_size(call.request),
+            'response_bytes': response_size(call.response),
+            'error': call.error
+        })
+
+@contextmanager
+def phase(name):
+    if not settings['enabled']:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record('phase', name, started, time.perf_counter(), {})
+
+def record(category, name, started, finished, details):
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': round((started - profile_started) * 1000000),
+        'dur': round((finished - started) * 1000000),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': details
+    }
+    with events_lock:
+        events.append(event)
+
+def payload_size(payload):
+    return len(json.dumps(payload, default=str))
+
+def response_size(response):
+    if not response:
+        return 0
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    if 'content-length' in headers:
+        return int(headers['content-length'])
+    return payload_size(response)
+
+def summary():
+    with events_lock:
+        recorded_events = list(events)
+    return {
+        'wall_seconds': round(time.perf_counter() - profile_started, 6),
+        'operations': summarize(recorded_events, 'api'),
+        'phases': summarize(recorded_events, 'phase')
+    }
+
+def summarize(recorded_events, category):
+    grouped = {}
+    for event in recorded_events:
+        if event['cat'] == category:
+            grouped.setdefault(event['name'], []).append(event)
+    result = {}
+    for name, named_events in sorted(grouped.items()):
+        durations = sorted(event['dur'] / 1000000 for event in named_events)
+        statistics = {'count': len(named_events), 'total_seconds': round(sum(durations), 6)}
+        for percentile in PERCENTILES:
+            statistics[f'p{percentile}_seconds'] = round(nearest_rank(durations, percentile), 6)
+        if category == 'api':
+            for key in ['retries', 'request_bytes', 'response_bytes']:
+                statistics[key] = sum(event['args'][key] for event in named_events)
+            statistics['errors'] = sum(1 for event in named_events if event['args']['error'])
+        result[name] = statistics
+    return result
+
+def nearest_rank(sorted_values, percentile):
+    index = max(0, -(-len(sorted_values) * percentile // 100) - 1)
+    return sorted_values[index]
+
+def write_profile(profile_file_path):
+    profile = summary()
+    with events_lock:
+        profile['traceEvents'] = list(events)
+    profile['displayTimeUnit'] = 'ms'
+    with open(profile_file_path, 'w') as f:
+        json.dump(profile, f, indent=2)
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+
+import wafr.store as store
+from wafr.errors import StoreError
+from wafr.output import print_table
+
+CHOICE_STATUS_QUERY = '''
+SELECT * FROM (
+    SELECT s.workload_id, COALESCE(w.name, ''), s.lens_alias, c.question_id,
+           CASE WHEN a.is_applicable = 0 THEN 'QUESTION_NOT_APPLICABLE' ELSE COALESCE(ac.status, 'UNSELECTED') END AS status,
+           s.taken_at
+    FROM latest_snapshots s
+    JOIN choices c ON c.lens_alias = s.lens_alias AND c.lens_version = s.lens_version AND c.choice_id = :choice_id
+    LEFT JOIN workloads w ON w.workload_id = s.workload_id
+    LEFT JOIN answers a ON a.snapshot_id = s.snapshot_id AND a.question_id = c.question_id
+    LEFT JOIN answer_choices ac ON ac.snapshot_id = s.snapshot_id AND ac.question_id = c.question_id AND ac.choice_id = c.choice_id
+    WHERE :lens_alias IS NULL OR s.lens_alias = :lens_alias
+) WHERE (status = 'SELECTED') = :selected
+ORDER BY 2, 1
+'''
+SNAPSHOTS_QUERY = '''
+SELECT s.workload_id, COALESCE(w.name, ''), s.lens_alias, s.lens_version, COUNT(*), MAX(s.taken_at)
+FROM snapshots s LEFT JOIN workloads w ON w.workload_id = s.workload_id
+WHERE :lens_alias IS NULL OR s.lens_alias = :lens_alias
+GROUP BY s.workload_id, s.lens_alias
+ORDER BY 2, 1, 3
+'''
+CHOICE_STATUS_HEADERS = ['WORKLOAD ID', 'NAME', 'LENS', 'QUESTION', 'STATUS', 'SNAPSHOT']
+SNAPSHOTS_HEADERS = ['WORKLOAD ID', 'NAME', 'LENS', 'LENS VERSION', 'SNAPSHOTS', 'LATEST SNAPSHOT']
+HISTORY_HEADERS = ['QUESTION', 'CHOICE', 'BEFORE', 'AFTER']
+
+
+def choice_status(choice_id, selected, lens_alias=None):
+    rows = open_store().execute(CHOICE_STATUS_QUERY, {'choice_id': choice_id, 'lens_alias': lens_alias, 'selected': selected}).fetchall()
+    print_table(CHOICE_STATUS_HEADERS, rows)
+    print(f"Workloads {'selecting' if selected else 'not selecting'} {choice_id}: {len(rows)}")
+
+def list_snapshots(lens_alias=None):
+    print_table(SNAPSHOTS_HEADERS, open_store().execute(SNAPSHOTS_QUERY, {'lens_alias': lens_alias}).fetchall())
+
+def workload_history(workload_id, lens_alias, since=''):
+    db = open_store()
+    snapshots = db.execute('SELECT snapshot_id, taken_at FROM snapshots WHERE workload_id = ? AND lens_alias = ? ORDER BY snapshot_id DESC',
+                           (workload_id, lens_alias)).fetchall()
+    if not snapshots:
+        raise StoreError(f'No snapshot of workload {workload_id} with lens {lens_alias} is stored.')
+    latest = snapshots[0]
+    earlier = [snapshot for snapshot in snapshots[1:] if not since or snapshot[1] < since]
+    if not earlier:
+        print(f"Only one snapshot of workload {workload_id} is stored{f' before {since}' if since else ''}, taken at {latest[1]}.")
+        return
+    base = earlier[0]
+    changes = snapshot_changes(db, base[0], latest[0])
+    print(f'Changes of workload {workload_id} ({lens_alias}) between {base[1]} and {latest[1]}:')
+    print_table(HISTORY_HEADERS, changes)
+    print(f'Changes: {len(changes)}')
+
+def snapshot_changes(db, base_snapshot_id, snapshot_id):
+    before, after = snapshot_state(db, base_snapshot_id), snapshot_state(db, snapshot_id)
+    changes = []
+    for key in sorted(before.keys() | after.keys()):
+        if before.get(key) != after.get(key):
+            changes.append(key + (describe_state(before.get(key)), describe_state(after.get(key))))
+    return changes
+
+def snapshot_state(db, snapshot_id):
+    state = {}
+    for question_id, is_applicable, reason, notes in db.execute(
+            'SELECT question_id, is_applicable, reason, notes FROM answers WHERE snapshot_id = ?', (snapshot_id,)):
+        state[(question_id, '')] = ('APPLICABLE' if is_applicable else 'NOT_APPLICABLE', reason, notes)
+    for question_id, choice_id, status, reason, notes in db.execute(
+            'SELECT question_id, choice_id, status, reason, notes FROM answer_choices WHERE snapshot_id = ?', (snapshot_id,)):
+        if status != 'UNSELECTED' or reason or notes:
+            state[(question_id, choice_id)] = (status, reason, notes)
+    return state
+
+def describe_state(state):
+    if state is None:
+        return 'UNSELECTED'
+    status, reason, notes = state
+    words = [status]
+    if reason:
+        words.append(f'reason={reason}')
+    if notes:
+        words.append(f'notes={notes!r}')
+    return ' '.join(words)
+
+def run_sql(sql):
+    db = open_store(read_only=True)
+    try:
+        cursor = db.execute(sql)
+    except sqlite3.Error as error:
+        raise StoreError(f'The query failed: {error}')
+    rows = cursor.fetchall()
+    print_table([column[0] for column in cursor.description or []], rows)
+
+def open_store(read_only=False):
+    if not os.path.exists(store.settings['path']):
+        raise StoreError(f"The store {store.settings['path']} does not exist. Export workloads with manage-template --store first.")
+    if read_only:
+        return store.read_only_connection()
+    return store.connection()
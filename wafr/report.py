@@ -0,0 +1,161 @@
+import csv
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+import config.config as conf
+import wafr.cache as cache
+import wafr.client as client
+from wafr.errors import ReportError
+from wafr.files import atomic_write
+from wafr.output import print_table
+from wafr.paginator import paginate
+
+LENS_REVIEW_CACHE = 'lens-reviews'
+RISKS = ['HIGH', 'MEDIUM', 'NONE', 'UNANSWERED', 'NOT_APPLICABLE']
+RISK_COLUMNS = [risk.lower() for risk in RISKS]
+
+PILLAR_COLUMNS = ['workload_id', 'workload_name', 'lens_alias', 'lens_name', 'lens_version', 'pillar_id', 'pillar_name'] + RISK_COLUMNS
+IMPROVEMENT_COLUMNS = ['workload_id', 'workload_name', 'lens_alias', 'pillar_id', 'question_id', 'question_title', 'risk', 'choice_id', 'choice_title']
+PILLAR_ROLLUP_COLUMNS = ['lens_alias', 'pillar_id', 'workloads', 'workloads_with_high_risk'] + RISK_COLUMNS
+CHOICE_ROLLUP_COLUMNS = ['lens_alias', 'pillar_id', 'question_id', 'choice_id', 'choice_title', 'workloads', 'high_risk_workloads', 'medium_risk_workloads']
+
+
+def generate_report(output_directory, output_format='csv', concurrency=conf.DEFAULT_CONCURRENCY):
+    if output_format == 'parquet':
+        parquet_writer()
+    workloads = list(paginate(client.get_client().list_workloads, 'WorkloadSummaries'))
+    pillars = new_table(PILLAR_COLUMNS)
+    improvements = new_table(IMPROVEMENT_COLUMNS)
+    cached = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for workload, (reviews, from_cache, error) in zip(workloads, executor.map(client.bind(workload_reviews), workloads)):
+            if error:
+                print(f"Failed: {workload['WorkloadName']} ({workload['WorkloadId']}): {error}", file=sys.stderr)
+                failed += 1
+                continue
+            cached += from_cache
+            for review in reviews:
+                add_review_rows(pillars, improvements, workload, review)
+
+    tables = {
+        'pillars': pillars,
+        'improvements': improvements,
+        'pillar-rollup': pillar_rollup(pillars),
+        'choice-rollup': choice_rollup(improvements)
+    }
+    for name, table in tables.items():
+        write_table(os.path.join(output_directory, f'{name}.{output_format}'), table, output_format)
+    print_table([column.upper().replace('_', ' ') for column in tables['pillar-rollup']], zip(*tables['pillar-rollup'].values()))
+    print(f'Workloads reported: {len(workloads) - failed}, from cache: {cached}, failed: {failed}')
+    return failed == 0
+
+def workload_reviews(workload):
+    cache_key = cache.scoped_key(client.get_client(), workload['WorkloadId'], str(workload.get('UpdatedAt', '')))
+    reviews = cache.get(LENS_REVIEW_CACHE, cache_key)
+    if reviews is not None:
+        return reviews, True, None
+    try:
+        lenses = workload.get('Lenses')
+        if lenses is None:
+            lenses = client.get_client().get_workload(WorkloadId=workload['WorkloadId'])['Workload']['Lenses']
+        reviews = [lens_review(workload['WorkloadId'], lens_alias) for lens_alias in lenses]
+    except (BotoCoreError, ClientError) as error:
+        return None, False, str(error)
+    cache.put(LENS_REVIEW_CACHE, cache_key, reviews)
+    return reviews, False, None
+
+def lens_review(workload_id, lens_alias):
+    review = client.get_client().get_lens_review(WorkloadId=workload_id, LensAlias=lens_alias)['LensReview']
+    return {
+        'lens_alias': lens_alias,
+        'lens_name': review.get('LensName', ''),
+        'lens_version': review.get('LensVersion', ''),
+        'pillars': [{'PillarId': pillar['PillarId'], 'PillarName': pillar.get('PillarName', ''), 'RiskCounts': pillar.get('RiskCounts', {})}
+                    for pillar in review.get('PillarReviewSummaries', [])],
+        'improvements': [improvement_summary(improvement) for improvement in paginate(
+            client.get_client().list_lens_review_improvements, 'ImprovementSummaries', WorkloadId=workload_id, LensAlias=lens_alias)]
+    }
+
+def improvement_summary(improvement):
+    return {
+        'PillarId': improvement.get('PillarId', ''),
+        'QuestionId': improvement['QuestionId'],
+        'QuestionTitle': improvement.get('QuestionTitle', ''),
+        'Risk': improvement.get('Risk', ''),
+        'ImprovementPlans': [{'ChoiceId': plan['ChoiceId'], 'DisplayText': plan.get('DisplayText', '')} for plan in improvement.get('ImprovementPlans', [])]
+    }
+
+def add_review_rows(pillars, improvements, workload, review):
+    for pillar in review['pillars']:
+        add_row(pillars, [workload['WorkloadId'], workload['WorkloadName'], review['lens_alias'], review['lens_name'], review['lens_version'],
+                          pillar['PillarId'], pillar['PillarName']] + [pillar['RiskCounts'].get(risk, 0) for risk in RISKS])
+    for improvement in review['improvements']:
+        question = [workload['WorkloadId'], workload['WorkloadName'], review['lens_alias'], improvement['PillarId'],
+                    improvement['QuestionId'], improvement['QuestionTitle'], improvement['Risk']]
+        for plan in improvement['ImprovementPlans'] or [{'ChoiceId': '', 'DisplayText': ''}]:
+            add_row(improvements, question + [plan['ChoiceId'], plan['DisplayText']])
+
+def pillar_rollup(pillars):
+    totals = defaultdict(lambda: [0] * (len(PILLAR_ROLLUP_COLUMNS) - 2))
+    risk_columns = [pillars[column] for column in RISK_COLUMNS]
+    for row_index, key in enumerate(zip(pillars['lens_alias'], pillars['pillar_id'])):
+        total = totals[key]
+        total[0] += 1
+        total[1] += pillars['high'][row_index] > 0
+        for risk_index, risk_column in enumerate(risk_columns):
+            total[2 + risk_index] += risk_column[row_index]
+    return table_from_rows(PILLAR_ROLLUP_COLUMNS, [list(key) + total for key, total in sorted(totals.items())])
+
+def choice_rollup(improvements):
+    totals = defaultdict(lambda: [set(), set(), set()])
+    titles = {}
+    columns = [improvements[column] for column in ['lens_alias', 'pillar_id', 'question_id', 'choice_id', 'choice_title', 'workload_id', 'risk']]
+    for lens_alias, pillar_id, question_id, choice_id, choice_title, workload_id, risk in zip(*columns):
+        if not choice_id:
+            continue
+        key = (lens_alias, pillar_id, question_id, choice_id)
+        titles[key] = choice_title
+        workloads, high_risk_workloads, medium_risk_workloads = totals[key]
+        workloads.add(workload_id)
+        if risk == 'HIGH':
+            high_risk_workloads.add(workload_id)
+        elif risk == 'MEDIUM':
+            medium_risk_workloads.add(workload_id)
+    rows = [list(key) + [titles[key]] + [len(workloads) for workloads in total] for key, total in totals.items()]
+    return table_from_rows(CHOICE_ROLLUP_COLUMNS, sorted(rows, key=lambda row: (-row[5], -row[6], row[:4])))
+
+def new_table(columns):
+    return {column: [] for column in columns}
+
+def add_row(table, row):
+    for values, value in zip(table.values(), row):
+        values.append(value)
+
+def table_from_rows(columns, rows):
+    table = new_table(columns)
+    for row in rows:
+        add_row(table, row)
+    return table
+
+def write_table(path, table, output_format):
+    if output_format == 'parquet':
+        pyarrow, parquet = parquet_writer()
+        with atomic_write(path, 'wb') as f:
+            parquet.write_table(pyarrow.table(table), f)
+    else:
+        with atomic_write(path) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(table.keys())
+            writer.writerows(zip(*table.values()))
+
+def parquet_writer():
+    try:
+        import pyarrow
+        import pyarrow.parquet as parquet
+    except ImportError:
+        raise ReportError('Parquet output requires the pyarrow package. Install it with: pip install pyarrow')
+    return pyarrow, parquet
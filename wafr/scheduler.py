@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, ConnectionClosedError, EndpointConnectionError, ReadTimeoutError
+
+import config.config as conf
+import wafr.profiler as profiler
+
+THROTTLING_ERROR_CODES = ['ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded']
+TRANSIENT_ERROR_CODES = ['InternalServerException', 'ServiceUnavailableException', 'ServiceUnavailable', 'RequestTimeout']
+CONNECTION_ERRORS = (ConnectionClosedError, EndpointConnectionError, ReadTimeoutError)
+COUNTER_NAMES = ['calls', 'retries', 'throttles', 'errors']
+DECREASE_FACTOR = 0.7
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst, minimum_rate, maximum_rate):
+        self.rate = rate
+        self.burst = burst
+        self.minimum_rate = minimum_rate
+        self.maximum_rate = maximum_rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.decreased = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.decreased < conf.API_BACKOFF_INTERVAL_SECONDS:
+                return
+            self.decreased = now
+            self.rate = max(self.minimum_rate, self.rate * DECREASE_FACTOR)
+            self.tokens = min(self.tokens, 0)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.maximum_rate, self.rate + conf.API_RATE_INCREASE)
+
+
+class AdaptiveLimit:
+
+    def __init__(self, initial, minimum, maximum):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.decreased = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled and now - self.decreased >= conf.API_BACKOFF_INTERVAL_SECONDS:
+                self.decreased = now
+                self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+            elif not throttled:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class RequestScheduler:
+
+    def __init__(self):
+        self.buckets = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.limit = AdaptiveLimit(conf.API_INITIAL_CONCURRENCY, 1, conf.API_MAX_CONCURRENCY)
+
+    def call(self, operation_name, operation, **kwargs):
+        with profiler.api_call(operation_name, kwargs) as api_call:
+            api_call.response = self.send(operation_name, operation, api_call, kwargs)
+            return api_call.response
+
+    def send(self, operation_name, operation, api_call, kwargs):
+        bucket = self.bucket(operation_name)
+        attempt = 1
+        while True:
+            bucket.acquire()
+            self.limit.acquire()
+            throttled = False
+            try:
+                self.count(operation_name, 'calls')
+                response = operation(**kwargs)
+                bucket.succeeded()
+                return response
+            except ClientError as error:
+                error_code = error.response.get('Error', {}).get('Code')
+                throttled = error_code in THROTTLING_ERROR_CODES
+                if throttled:
+                    self.count(operation_name, 'throttles')
+                    bucket.throttled()
+                if not (throttled or error_code in TRANSIENT_ERROR_CODES) or attempt >= conf.API_MAX_ATTEMPTS:
+                    self.count(operation_name, 'errors')
+                    raise
+            except CONNECTION_ERRORS:
+                if attempt >= conf.API_MAX_ATTEMPTS:
+                    self.count(operation_name, 'errors')
+                    raise
+            finally:
+                self.limit.release(throttled)
+            self.count(operation_name, 'retries')
+            api_call.retries += 1
+            time.sleep(retry_delay(attempt))
+            attempt += 1
+
+    def bucket(self, operation_name):
+        with self.lock:
+            if operation_name not in self.buckets:
+                rate = conf.API_OPERATION_REQUESTS_PER_SECOND.get(operation_name, conf.API_REQUESTS_PER_SECOND)
+                self.buckets[operation_name] = TokenBucket(rate, conf.API_BURST, conf.API_MIN_REQUESTS_PER_SECOND, conf.API_MAX_REQUESTS_PER_SECOND)
+            return self.buckets[operation_name]
+
+    def count(self, operation_name, counter_name):
+        with self.lock:
+            counters = self.counters.setdefault(operation_name, dict.fromkeys(COUNTER_NAMES, 0))
+            counters[counter_name] += 1
+
+
+def retry_delay(attempt):
+    return random.uniform(0, min(conf.API_RETRY_MAX_SECONDS, conf.API_RETRY_BASE_SECONDS * 2 ** attempt))
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import wafr.delta as delta
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workloads (
+    workload_id TEXT PRIMARY KEY,
+    name TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS lens_versions (
+    lens_alias TEXT NOT NULL,
+    lens_version TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (lens_alias, lens_version)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    lens_alias TEXT NOT NULL,
+    lens_version TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    pillar_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    PRIMARY KEY (lens_alias, lens_version, question_id)
+);
+CREATE TABLE IF NOT EXISTS choices (
+    lens_alias TEXT NOT NULL,
+    lens_version TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    choice_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    PRIMARY KEY (lens_alias, lens_version, question_id, choice_id)
+);
+CREATE INDEX IF NOT EXISTS choices_by_choice_id ON choices (choice_id);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY,
+    workload_id TEXT NOT NULL,
+    lens_alias TEXT NOT NULL,
+    lens_version TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    workload_updated_at TEXT,
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_workload ON snapshots (workload_id, lens_alias, snapshot_id);
+CREATE TABLE IF NOT EXISTS answers (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (snapshot_id),
+    question_id TEXT NOT NULL,
+    is_applicable INTEGER NOT NULL,
+    reason TEXT,
+    notes TEXT,
+    PRIMARY KEY (snapshot_id, question_id)
+);
+CREATE TABLE IF NOT EXISTS answer_choices (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (snapshot_id),
+    question_id TEXT NOT NULL,
+    choice_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    notes TEXT,
+    PRIMARY KEY (snapshot_id, question_id, choice_id)
+);
+CREATE INDEX IF NOT EXISTS answer_choices_by_choice ON answer_choices (choice_id, status);
+CREATE VIEW IF NOT EXISTS latest_snapshots AS
+    SELECT * FROM snapshots WHERE snapshot_id IN (SELECT MAX(snapshot_id) FROM snapshots GROUP BY workload_id, lens_alias);
+'''
+
+settings = {'path': None}
+connections = threading.local()
+
+
+def configure(path=None):
+    settings['path'] = path
+
+def enabled():
+    return settings['path'] is not None
+
+def connection():
+    if getattr(connections, 'path', None) != settings['path']:
+        connections.connection = sqlite3.connect(settings['path'], timeout=60)
+        connections.connection.execute('PRAGMA journal_mode=WAL')
+        connections.connection.executescript(SCHEMA)
+        connections.path = settings['path']
+    return connections.connection
+
+def read_only_connection():
+    return sqlite3.connect(f"file:{settings['path']}?mode=ro", uri=True)
+
+def record_workloads(workload_summaries):
+    with connection() as db:
+        db.executemany('INSERT INTO workloads (workload_id, name, updated_at) VALUES (?, ?, ?) '
+                       'ON CONFLICT (workload_id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at',
+                       [(workload['WorkloadId'], workload['WorkloadName'], str(workload.get('UpdatedAt', ''))) for workload in workload_summaries])
+
+def record_snapshot(entries, workload_id, lens_alias, lens_version):
+    questions = []
+    for entry in entries:
+        pillar, question, answer = entry
+        if question is not None:
+            questions.append((pillar[1], question, answer))
+        yield entry
+    write_snapshot(workload_id, lens_alias, lens_version or '', questions)
+
+def write_snapshot(workload_id, lens_alias, lens_version, questions):
+    question_rows, choice_rows, answer_rows, answer_choice_rows = snapshot_rows(lens_alias, lens_version, questions)
+    content_hash = hashlib.sha256(json.dumps([answer_rows, answer_choice_rows]).encode('utf-8')).hexdigest()
+    taken_at = now()
+    with connection() as db:
+        db.execute('INSERT OR IGNORE INTO workloads (workload_id) VALUES (?)', (workload_id,))
+        db.execute('INSERT OR IGNORE INTO lens_versions (lens_alias, lens_version, recorded_at) VALUES (?, ?, ?)', (lens_alias, lens_version, taken_at))
+        db.executemany('INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?)', question_rows)
+        db.executemany('INSERT OR REPLACE INTO choices VALUES (?, ?, ?, ?, ?, ?)', choice_rows)
+        latest = db.execute('SELECT content_hash, lens_version FROM snapshots WHERE workload_id = ? AND lens_alias = ? ORDER BY snapshot_id DESC LIMIT 1',
+                            (workload_id, lens_alias)).fetchone()
+        if latest == (content_hash, lens_version):
+            return
+        snapshot_id = db.execute('INSERT INTO snapshots (workload_id, lens_alias, lens_version, taken_at, workload_updated_at, content_hash) '
+                                 'VALUES (?, ?, ?, ?, (SELECT updated_at FROM workloads WHERE workload_id = ?), ?)',
+                                 (workload_id, lens_alias, lens_version, taken_at, workload_id, content_hash)).lastrowid
+        db.executemany('INSERT INTO answers VALUES (?, ?, ?, ?, ?)', [(snapshot_id,) + row for row in answer_rows])
+        db.executemany('INSERT INTO answer_choices VALUES (?, ?, ?, ?, ?, ?)', [(snapshot_id,) + row for row in answer_choice_rows])
+
+def snapshot_rows(lens_alias, lens_version, questions):
+    question_rows, choice_rows, answer_rows, answer_choice_rows = [], [], [], []
+    for position, (pillar_id, question, answer) in enumerate(questions):
+        question_id = question['QuestionId']
+        question_rows.append((lens_alias, lens_version, question_id, pillar_id, position, question['QuestionTitle']))
+        choice_rows.extend((lens_alias, lens_version, question_id, choice['ChoiceId'], choice_position, choice['Title'])
+                           for choice_position, choice in enumerate(question['Choices']))
+        answer_rows.append((question_id, int(answer.get('IsApplicable', True)), answer.get('Reason'), answer.get('Notes')))
+        answer_choice_rows.extend((question_id, choice_id, choice_answer['Status'], choice_answer.get('Reason'), choice_answer.get('Notes'))
+                                  for choice_id, choice_answer in sorted(delta.current_choice_answers(answer).items()))
+    return question_rows, choice_rows, answer_rows, answer_choice_rows
+
+def snapshot_workload_ids(lens_alias):
+    return {row[0] for row in connection().execute('SELECT DISTINCT workload_id FROM snapshots WHERE lens_alias = ?', (lens_alias,))}
+
+def latest_snapshot(workload_id, lens_alias):
+    return connection().execute('SELECT snapshot_id, lens_version FROM latest_snapshots WHERE workload_id = ? AND lens_alias = ?',
+                                (workload_id, lens_alias)).fetchone()
+
+def snapshot_answers(workload_id, lens_alias):
+    snapshot = latest_snapshot(workload_id, lens_alias)
+    if snapshot is None:
+        return None
+    snapshot_id, lens_version = snapshot
+    db = connection()
+    answers = {}
+    for question_id, is_applicable, reason, notes in db.execute(
+            'SELECT question_id, is_applicable, reason, notes FROM answers WHERE snapshot_id = ?', (snapshot_id,)):
+        answers[question_id] = present_values(IsApplicable=bool(is_applicable), Reason=reason, Notes=notes, ChoiceAnswers=[])
+    for question_id, choice_id, status, reason, notes in db.execute(
+            'SELECT question_id, choice_id, status, reason, notes FROM answer_choices WHERE snapshot_id = ?', (snapshot_id,)):
+        answers[question_id]['ChoiceAnswers'].append(present_values(ChoiceId=choice_id, Status=status, Reason=reason, Notes=notes))
+    catalog = lens_catalog(lens_alias, lens_version)
+    for questions in catalog.values():
+        for question in questions:
+            question['IsApplicable'] = answers.get(question['QuestionId'], {}).get('IsApplicable', True)
+    return catalog, answers
+
+def lens_catalog(lens_alias, lens_version=None):
+    db = connection()
+    if lens_version is None:
+        row = db.execute('SELECT lens_version FROM lens_versions WHERE lens_alias = ? ORDER BY recorded_at DESC LIMIT 1', (lens_alias,)).fetchone()
+        if row is None:
+            return None
+        lens_version = row[0]
+    catalog = {}
+    questions = {}
+    for question_id, pillar_id, title in db.execute(
+            'SELECT question_id, pillar_id, title FROM questions WHERE lens_alias = ? AND lens_version = ? ORDER BY position', (lens_alias, lens_version)):
+        questions[question_id] = {'QuestionId': question_id, 'QuestionTitle': title, 'Choices': []}
+        catalog.setdefault(pillar_id, []).append(questions[question_id])
+    for question_id, choice_id, title in db.execute(
+            'SELECT question_id, choice_id, title FROM choices WHERE lens_alias = ? AND lens_version = ? ORDER BY question_id, position', (lens_alias, lens_version)):
+        questions[question_id]['Choices'].append({'ChoiceId': choice_id, 'Title': title})
+    return catalog
+
+def present_values(**values):
+    return {key: value for key, value in values.items() if value is not None}
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
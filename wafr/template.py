@@ -1,11 +1,20 @@
-from textwrap import indent
-import boto3
-import config.config as conf
-import wafr.lens as lens
+import json
+import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-well_architected_tool_client = boto3.client('wellarchitected')
+import yaml
 
-MAX_ANSWER_COUNT = 30
+import config.config as conf
+import wafr.cache as cache
+import wafr.client as client
+import wafr.lens as lens
+import wafr.profiler as profiler
+import wafr.store as store
+from wafr.errors import TemplateError
+from wafr.files import atomic_write
+from wafr.paginator import paginate
 
 INDENT_SIZE = 2
 INDENT_0 = INDENT_SIZE * 0
@@ -14,6 +23,16 @@ INDENT_2 = INDENT_SIZE * 2
 INDENT_3 = INDENT_SIZE * 3
 INDENT_4 = INDENT_SIZE * 4
 
+LENS_CATALOG_CACHE = 'lens-catalogs'
+ANSWER_WINDOW_PER_WORKER = 4
+
+PLAIN_SCALAR = re.compile(r'[A-Za-z0-9_(/][^\x00-\x1f\x7f-\U0010ffff:#]*(?<! )')
+LITERAL_TEXT = re.compile(r'[^\x00-\x08\x0b-\x1f\x7f-\x9f\u2028\u2029\ud800-\udfff\ufffe\uffff]*')
+UNSAFE_QUOTED_CHARACTERS = re.compile(r'[\x7f-\x9f\u2028\u2029\ud800-\udfff\ufffe\uffff]')
+STRING_TAG = 'tag:yaml.org,2002:str'
+
+scalar_resolver = yaml.resolver.Resolver()
+
 PILLAR_ID_INDEX = 1
 pillar_label_name_dict = [['SEC', 'security'], 
                           ['REL', 'reliability'],
@@ -23,52 +42,135 @@ pillar_label_name_dict = [['SEC', 'security'],
                           ['SUS', 'sustainability']]
 
 
-def start_generation(workload_id, output_file, save_workload, list_workloads, custom_lens):
+def start_generation(workload_id, output_file, save_workload, list_workloads, custom_lens, concurrency=conf.DEFAULT_CONCURRENCY, from_store=False):
     if list_workloads:
         list_all_workloads()
     else:
-        write_template(output_file, generate_new_template(workload_id, save_workload, custom_lens))
+        with profiler.phase('template-generation'):
+            write_template(output_file, generate_new_template(workload_id, save_workload, custom_lens, concurrency, from_store))
 
 def list_all_workloads():
-    for workload in well_architected_tool_client.list_workloads(MaxResults=20)['WorkloadSummaries']:
+    for workload in paginate(client.get_client().list_workloads, 'WorkloadSummaries'):
         print(f"Name: {workload['WorkloadName']}, Id: {workload['WorkloadId']}")
 
-def generate_new_template(workload_id, save_workload, custom_lens):
-    template = []
-    lens_alias = conf.STANDARD_LENS_ALIAS
+def get_template_lens(custom_lens):
     if custom_lens == conf.EKS_LENS_ALIAS:
-        lens_alias = lens.get_lens_alias(conf.EKS_LENS_LABEL)
-        append_new_line(template, INDENT_0, conf.LENS_KEY, conf.EKS_LENS_LABEL)
+        return lens.get_lens_alias(conf.EKS_LENS_LABEL), conf.EKS_LENS_LABEL
+    return conf.STANDARD_LENS_ALIAS, conf.STANDARD_LENS_LABEL
+
+def generate_new_template(workload_id, save_workload, custom_lens, concurrency=conf.DEFAULT_CONCURRENCY, from_store=False):
+    lens_alias, lens_label = get_template_lens(custom_lens)
+    yield new_line(INDENT_0, conf.LENS_KEY, yaml_scalar(lens_label))
+    if from_store:
+        yield from template_lines(stored_entries(workload_id, lens_alias, save_workload), save_workload)
+    elif save_workload:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            entries = stream_workload_answers(executor, workload_id, lens_alias, concurrency * ANSWER_WINDOW_PER_WORKER)
+            if store.enabled():
+                entries = store.record_snapshot(entries, workload_id, lens_alias, lens.get_workload_lens_version(workload_id, lens_alias))
+            yield from template_lines(entries, save_workload)
+    else:
+        yield from template_lines(catalog_entries(get_lens_catalog(workload_id, lens_alias, concurrency)), save_workload)
+
+def get_lens_catalog(workload_id, lens_alias, concurrency=conf.DEFAULT_CONCURRENCY):
+    lens_summary = lens.get_lens_summary(lens_alias)
+    cache_key = None
+    catalog = None
+    if lens_summary:
+        lens_version = lens.get_workload_lens_version(workload_id, lens_alias) if workload_id else lens_summary.get('LensVersion', '')
+        cache_key = f"{lens_summary['LensArn']}@{lens_version}"
+        catalog = cache.get(LENS_CATALOG_CACHE, cache_key)
+    if catalog is None:
+        if not workload_id:
+            raise TemplateError(f'The question catalog of lens {lens_alias} is not cached yet. Please specify a workload id using this lens.')
+        catalog = fetch_lens_catalog(workload_id, lens_alias, concurrency)
+        if cache_key:
+            cache.put(LENS_CATALOG_CACHE, cache_key, catalog)
+    return [(pillar, catalog[pillar[PILLAR_ID_INDEX]]) for pillar in pillar_label_name_dict]
+
+def fetch_lens_catalog(workload_id, lens_alias, concurrency=conf.DEFAULT_CONCURRENCY):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        answer_lists = executor.map(client.bind(lambda pillar: list_all_questions_with_answers_from_workload(workload_id, pillar, lens_alias)),
+                                    pillar_label_name_dict)
+        catalog = {}
+        for pillar, questions in zip(pillar_label_name_dict, answer_lists):
+            catalog[pillar[PILLAR_ID_INDEX]] = [catalog_question(question) for question in questions]
+    return catalog
+
+def catalog_question(question):
+    return {
+        'QuestionId': question['QuestionId'],
+        'QuestionTitle': question['QuestionTitle'],
+        'Choices': [{'ChoiceId': choice['ChoiceId'], 'Title': choice['Title']} for choice in question['Choices']]
+    }
+
+def catalog_entries(catalog):
+    for pillar, questions in catalog:
+        yield pillar, None, None
+        for question in questions:
+            yield pillar, question, {}
+
+def stored_entries(workload_id, lens_alias, save_workload):
+    if save_workload:
+        snapshot = store.snapshot_answers(workload_id, lens_alias)
+        if snapshot is None:
+            raise TemplateError(f'No snapshot of workload {workload_id} with lens {lens_alias} is stored. Please export it first with --store.')
+        catalog, answers = snapshot
     else:
-        append_new_line(template, INDENT_0, conf.LENS_KEY, conf.STANDARD_LENS_LABEL)
+        catalog, answers = store.lens_catalog(lens_alias), {}
+        if catalog is None:
+            raise TemplateError(f'No question catalog of lens {lens_alias} is stored. Please export a workload using this lens first with --store.')
     for pillar in pillar_label_name_dict:
-        questions_with_answers = list_all_questions_with_answers_from_workload(workload_id, pillar, lens_alias)
-        append_pillar(template, pillar[PILLAR_ID_INDEX])
-        question_counter = init_question_counter()
-        for question in extract_question_dict(questions_with_answers):
-            question_details = get_question_answer_details(workload_id, question['QuestionId'], lens_alias)
-            append_question_label(template, pillar, question_counter)
-            append_question_id(template, question_id=question['QuestionId'])
-            append_question_title(template, question_title=question['QuestionTitle'])
-            if 'Notes' in question_details:
-                append_question_note(template, question_note=question_details['Notes'])
-            question_applicable = bool(question['IsApplicable'])
-            if save_workload and not question_applicable:
-                append_answer_not_applicable(template)
-            else:
-                append_answers(template, question, save_workload, question_details)                
+        yield pillar, None, None
+        for question in catalog.get(pillar[PILLAR_ID_INDEX], []):
+            yield pillar, question, answers.get(question['QuestionId'], {})
 
+def stream_workload_answers(executor, workload_id, lens_alias, window):
+    answer_lists = [executor.submit(client.bind(list_all_questions_with_answers_from_workload), workload_id, pillar, lens_alias)
+                    for pillar in pillar_label_name_dict]
+    pending = deque()
+    for pillar, answer_list in zip(pillar_label_name_dict, answer_lists):
+        pending.append((pillar, None, None))
+        for question in answer_list.result():
+            pending.append((pillar, question, executor.submit(client.bind(get_question_answer_details), workload_id, question['QuestionId'], lens_alias)))
+            while len(pending) > window:
+                yield resolved_entry(pending.popleft())
+    while pending:
+        yield resolved_entry(pending.popleft())
+
+def resolved_entry(entry):
+    pillar, question, answer_details = entry
+    if answer_details is None:
+        return entry
+    return pillar, question, answer_details.result()
+
+def template_lines(entries, save_workload):
+    question_counter = init_question_counter()
+    for pillar, question, question_details in entries:
+        if question is None:
+            yield pillar_line(pillar[PILLAR_ID_INDEX])
+            question_counter = init_question_counter()
+        else:
+            yield from question_lines(pillar, question_counter, question, question_details, save_workload)
             question_counter = increase_question_counter(question_counter)
-    return template
 
-def extract_question_dict(questions_with_answers):
-    return questions_with_answers['AnswerSummaries']
+def question_lines(pillar, question_counter, question, question_details, save_workload):
+    yield question_label_line(pillar, question_counter)
+    yield question_id_line(question_id=question['QuestionId'])
+    yield question_title_line(question_title=question['QuestionTitle'])
+    if 'Notes' in question_details:
+        yield question_note_line(question_note=question_details['Notes'])
+    question_applicable = bool(question.get('IsApplicable', True))
+    if save_workload and not question_applicable:
+        yield answer_not_applicable_line()
+    else:
+        yield from answer_lines(question, save_workload, question_details)
 
 def list_all_questions_with_answers_from_workload(workload_id, pillar, lens_label):
-    return well_architected_tool_client.list_answers(WorkloadId=workload_id,
+    return list(paginate(client.get_client().list_answers, 'AnswerSummaries',
+                        WorkloadId=workload_id,
                         LensAlias=lens_label,
-                        PillarId=pillar[PILLAR_ID_INDEX],
-                        MaxResults=MAX_ANSWER_COUNT)
+                        PillarId=pillar[PILLAR_ID_INDEX]))
 
 def init_question_counter():
     return 1
@@ -76,76 +178,77 @@ def init_question_counter():
 def increase_question_counter(question_counter):
     return question_counter + 1
 
-def append_pillar(template, pillar):
-    append_new_line(template, indent=INDENT_0, key=pillar, value='')
-
-def append_question_label(template, pillar, count):
-    append_new_line(template, INDENT_1, key='- label', value=f"{str(pillar[0])} {str(count)}")
-
-def append_question_id(template, question_id):
-    append_new_line(template, indent=INDENT_2, key='question_id', value=question_id)
-
-def append_question_title(template, question_title):
-    append_new_line(template, indent=INDENT_2, key='title', value=question_title)
-
-def append_question_note(template, question_note):
-    question_note_lines = question_note.split('\n')
-    question_note = '|-\n' 
-    for i, line in enumerate(question_note_lines):
-        question_note = question_note + str(f"{'':<{INDENT_3}}{line}") + add_new_line(index=i, last_index=len(question_note_lines) - 1)
-    append_new_line(template, indent=INDENT_2, key='notes', value=question_note)
-
-def add_new_line(index, last_index):
-    if index < last_index:
-        return '\n'
-    return ''
-    
-def append_answers(template, question, save_workload, question_details):
-    append_answers_header(template)
-    if 'ChoiceAnswers' in question_details:
-        marked_answers = question_details['ChoiceAnswers']
-    else:
-        marked_answers = []
-    for answers in question['Choices']:
-        append_answer_id(template, answer_id=answers['ChoiceId'])
-        append_answer_title(template, answers['Title'])
-        if save_workload:
-            append_answer_status_and_comments(template, answers, marked_answers)
+def pillar_line(pillar):
+    return new_line(indent=INDENT_0, key=pillar, value='')
+
+def question_label_line(pillar, count):
+    return new_line(INDENT_1, key='- label', value=yaml_scalar(f"{pillar[0]} {count}"))
+
+def question_id_line(question_id):
+    return new_line(indent=INDENT_2, key='question_id', value=yaml_scalar(question_id))
+
+def question_title_line(question_title):
+    return new_line(indent=INDENT_2, key='title', value=yaml_scalar(question_title))
 
-def append_answers_header(template):
-    append_new_line(template, indent=INDENT_2, key='answers', value='')
+def question_note_line(question_note):
+    return new_line(indent=INDENT_2, key='notes', value=yaml_text(question_note, INDENT_3, single_line_block=True))
 
-def append_answer_id(template, answer_id):
-    append_new_line(template, indent=INDENT_3, key='- id', value=answer_id)
+def answer_lines(question, save_workload, question_details):
+    yield answers_header_line()
+    marked_answers = {marked_answer['ChoiceId']: marked_answer for marked_answer in question_details.get('ChoiceAnswers', [])}
+    for answer in question['Choices']:
+        yield answer_id_line(answer_id=answer['ChoiceId'])
+        yield answer_title_line(answer['Title'])
+        if save_workload and answer['ChoiceId'] in marked_answers:
+            yield from answer_status_and_comments_lines(marked_answers[answer['ChoiceId']])
 
-def append_answer_title(template, answer_title):
-    append_new_line(template, indent=INDENT_4, key='title', value=answer_title)
+def answers_header_line():
+    return new_line(indent=INDENT_2, key='answers', value='')
 
-def append_answer_status_and_comments(template, default_answers, marked_answers):
-    for marked_answer in marked_answers:
-        if marked_answer['ChoiceId'] == default_answers['ChoiceId']:
-            append_answer_status(template, status=marked_answer['Status'])
-            if marked_answer['Status'] == 'NOT_APPLICABLE':
-                append_answer_reason(template, reason=marked_answer['Reason'])                
-                append_answer_notes(template, notes=marked_answer['Notes'])
+def answer_id_line(answer_id):
+    return new_line(indent=INDENT_3, key='- id', value=yaml_scalar(answer_id))
 
-def append_answer_status(template, status):
-    append_new_line(template, indent=INDENT_4, key='status', value=status)
+def answer_title_line(answer_title):
+    return new_line(indent=INDENT_4, key='title', value=yaml_scalar(answer_title))
 
-def append_answer_reason(template, reason):
-    append_new_line(template, indent=INDENT_4, key='reason', value=reason)
+def answer_status_and_comments_lines(marked_answer):
+    yield answer_status_line(status=marked_answer['Status'])
+    if marked_answer['Status'] == 'NOT_APPLICABLE':
+        yield answer_reason_line(reason=marked_answer['Reason'])
+        yield answer_notes_line(notes=marked_answer.get('Notes', ''))
 
-def append_answer_notes(template, notes):
-    append_new_line(template, indent=INDENT_4, key='notes', value=notes)
+def answer_status_line(status):
+    return new_line(indent=INDENT_4, key='status', value=yaml_scalar(status))
 
-def append_answer_not_applicable(template):
-    append_new_line(template, indent=INDENT_2, key='not_applicable', value='true')
+def answer_reason_line(reason):
+    return new_line(indent=INDENT_4, key='reason', value=yaml_scalar(reason))
 
-def append_new_line(template, indent, key, value):
-    template.append(str(f"{'':<{indent}}{key}: {value}"))
+def answer_notes_line(notes):
+    return new_line(indent=INDENT_4, key='notes', value=yaml_text(notes, INDENT_4 + INDENT_SIZE))
+
+def answer_not_applicable_line():
+    return new_line(indent=INDENT_2, key='not_applicable', value='true')
+
+def new_line(indent, key, value):
+    return f"{'':<{indent}}{key}: {value}"
+
+def yaml_scalar(value):
+    value = str(value)
+    if PLAIN_SCALAR.fullmatch(value) and scalar_resolver.resolve(yaml.ScalarNode, value, (True, False)) == STRING_TAG:
+        return value
+    return UNSAFE_QUOTED_CHARACTERS.sub(lambda match: f'\\u{ord(match.group()):04x}', json.dumps(value, ensure_ascii=False))
+
+def yaml_text(value, indent, single_line_block=False):
+    if ('\n' in value or single_line_block) and literal_block_allowed(value):
+        return '|-' + ''.join(f"\n{'':<{indent}}{line}" for line in value.split('\n'))
+    return yaml_scalar(value)
+
+def literal_block_allowed(value):
+    first_content = value.lstrip('\n')[:1]
+    return first_content not in ('', ' ', '\t') and not value.endswith('\n') and LITERAL_TEXT.fullmatch(value) is not None
 
 def get_question_answer_details(workload_id, question_id, lens_label):
-    result = well_architected_tool_client.get_answer(
+    result = client.get_client().get_answer(
         WorkloadId=workload_id,
         LensAlias=lens_label,
         QuestionId=question_id)
@@ -154,9 +257,9 @@ def get_question_answer_details(workload_id, question_id, lens_label):
 def write_template(output_file, template):
     if output_file == '':
         for line in template:
-            print(line)
+            sys.stdout.write(line + '\n')
+        sys.stdout.flush()
     else:
-        f = open(output_file, "w")
-        for line in template:
-            f.write(line + '\n')
-  
+        with atomic_write(output_file) as f:
+            for line in template:
+                f.write(line + '\n')
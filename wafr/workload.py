@@ -1,55 +1,91 @@
-from calendar import c
-import boto3
-import yaml
-from datetime import datetime
+import threading
 
 import config.config as conf
+import wafr.cache as cache
+import wafr.client as client
 import wafr.lens as lens
+import wafr.delta as delta
+import wafr.journal as journal
+import wafr.model as model
+from wafr.paginator import paginate, NameIndex
 
-well_architected_tool_client = boto3.client('wellarchitected')
+workload_indexes = {}
+workload_lock = threading.Lock()
 
-def create_new_workload(template_file_path, workload_name, description, environment, account_ids, regions, review_owner, disable_standard, trusted_advisor):
+STANDARD_TEMPLATE_PATH = 'templates/standard.yaml'
+
+def create_new_workload(template_file_path, workload_name, description, environment, account_ids, regions, review_owner, disable_standard, trusted_advisor, resume=False):
     template = get_template_content(template_file_path)
-    lens_alias = get_lens_alias(template_file_path)
+    lens_alias = lens.get_lens_alias(template.lens)
     if not lens_alias:
         print('No lens exist for this type of template. Please publish first the lens and then create the workload.')
     else:
-        workload = well_architected_tool_client.create_workload(
-            WorkloadName=workload_name,
-            Description=description,
-            Environment=convert_environment(environment),
-            AccountIds=account_ids,
-            AwsRegions=regions,
-            ReviewOwner=review_owner,
-            PillarPriorities=['security', 'reliability', 'operationalExcellence', 'performance', 'costOptimization', 'sustainability'],
-            Lenses=[lens_alias],
-            ClientRequestToken=str(datetime.now()),
-            DiscoveryConfig={
-                'TrustedAdvisorIntegrationStatus': 'ENABLED' if trusted_advisor == 'enable' else 'DISABLED'
-            }
-        )
-        workload_id = workload['WorkloadId']
+        run_journal = journal.open_journal('create-workload', cache.scoped_key(client.get_client()),
+                                           [journal.file_hash(template_file_path), workload_name, description, environment, account_ids, regions,
+                                            review_owner, disable_standard, trusted_advisor], resume)
+        workload_id = run_journal.workload_id
+        if workload_id is None:
+            workload_id = create_workload(workload_name, description, environment, account_ids, regions, review_owner, lens_alias, trusted_advisor)
+            run_journal.record_workload(workload_id)
+        else:
+            print(f'Continuing with the workload {workload_id} created by the previous run')
         if disabling_standard_lens(disable_standard, lens_alias):
-            disable_standard_questions(workload_id, get_template_content('templates/standard.yaml'))
-        apply_marks_in_well_architected_tool(workload_id, template, lens_alias)
+            disable_standard_questions(workload_id, get_template_content(STANDARD_TEMPLATE_PATH), run_journal=run_journal)
+        apply_marks_in_well_architected_tool(workload_id, template, lens_alias, run_journal=run_journal)
+        run_journal.finish()
         print(f"Workload updated with the marked question from the {template_file_path} file")
 
-def update_existing_workload(template_file_path, workload_name, disable_standard):
+def create_workload(workload_name, description, environment, account_ids, regions, review_owner, lens_alias, trusted_advisor):
+    workload = client.get_client().create_workload(
+        WorkloadName=workload_name,
+        Description=description,
+        Environment=convert_environment(environment),
+        AccountIds=account_ids,
+        AwsRegions=regions,
+        ReviewOwner=review_owner,
+        PillarPriorities=['security', 'reliability', 'operationalExcellence', 'performance', 'costOptimization', 'sustainability'],
+        Lenses=[lens_alias],
+        ClientRequestToken=journal.request_token(workload_name, description, environment, account_ids, regions, review_owner, lens_alias, trusted_advisor),
+        DiscoveryConfig={
+            'TrustedAdvisorIntegrationStatus': 'ENABLED' if trusted_advisor == 'enable' else 'DISABLED'
+        }
+    )
+    workload_id = workload['WorkloadId']
+    get_workload_index().add(workload_name, workload_id)
+    return workload_id
+
+def update_existing_workload(template_file_path, workload_name, disable_standard, only_changes=False, plan=False, concurrency=conf.DEFAULT_CONCURRENCY, resume=False):
     template = get_template_content(template_file_path)
-    lens_alias = get_lens_alias(template_file_path)
+    lens_alias = lens.get_lens_alias(template.lens)
     workload_id = get_workload_id(workload_name)    
+    if plan:
+        print_update_plan(workload_id, template, lens_alias, disable_standard, concurrency)
+        return
+    run_journal = journal.open_journal('update-workload', cache.scoped_key(client.get_client()),
+                                       [journal.file_hash(template_file_path), workload_name, workload_id, disable_standard, only_changes], resume)
     if adding_new_lens(workload_id, lens_alias) and update_allowed():
         associate_new_lens(workload_id, lens_alias)
-    apply_marks_in_well_architected_tool(workload_id, template, lens_alias)
+    apply_marks_in_well_architected_tool(workload_id, template, lens_alias, only_changes, concurrency, run_journal)
     if disabling_standard_lens(disable_standard, lens_alias):
-        disable_standard_questions(workload_id, get_template_content('templates/standard.yaml'))
+        disable_standard_questions(workload_id, get_template_content(STANDARD_TEMPLATE_PATH), only_changes, concurrency, run_journal)
+    run_journal.finish()
     print(f"Workload updated with the marked question from the {template_file_path} file")
 
+def print_update_plan(workload_id, template, lens_alias, disable_standard, concurrency):
+    answer_updates = plan_answer_updates(template)
+    if adding_new_lens(workload_id, lens_alias):
+        print(f"Lens {lens_alias} would be added to the workload, all {len(answer_updates)} marked questions would be updated")
+    else:
+        delta.print_answer_changes(lens_alias, delta.diff_answer_updates(workload_id, answer_updates, lens_alias, concurrency))
+    if disabling_standard_lens(disable_standard, lens_alias):
+        disable_updates = plan_disable_updates(get_template_content(STANDARD_TEMPLATE_PATH))
+        delta.print_answer_changes(conf.STANDARD_LENS_ALIAS, delta.diff_answer_updates(workload_id, disable_updates, conf.STANDARD_LENS_ALIAS, concurrency))
+
 def disabling_standard_lens(disable_standard, lens_alias):
     return disable_standard and lens_alias != conf.STANDARD_LENS_ALIAS
 
 def adding_new_lens(workload_id, lens_alias):
-    workload_lenses = well_architected_tool_client.get_workload(
+    workload_lenses = client.get_client().get_workload(
             WorkloadId=workload_id
         )['Workload']['Lenses']
     if lens_alias not in workload_lenses:
@@ -70,7 +106,7 @@ def update_allowed():
     return False
 
 def associate_new_lens(workload_id, lens_alias):
-    well_architected_tool_client.associate_lenses(
+    client.get_client().associate_lenses(
         WorkloadId=workload_id,
         LensAliases=[
             lens_alias
@@ -85,84 +121,113 @@ def convert_environment(environment):
     return environment
 
 def get_workload_id(workload_name):
-    workload_list = well_architected_tool_client.list_workloads()['WorkloadSummaries']
-    for workload in workload_list:
-        if workload['WorkloadName'] == workload_name:
-            return workload['WorkloadId']
+    return get_workload_index().get(workload_name)
+
+def get_workload_index():
+    scope = cache.scoped_key(client.get_client())
+    with workload_lock:
+        if scope not in workload_indexes:
+            workload_indexes[scope] = NameIndex(client.bind(list_workloads), name_key='WorkloadName', id_key='WorkloadId')
+        return workload_indexes[scope]
+
+def list_workloads():
+    return paginate(client.get_client().list_workloads, 'WorkloadSummaries')
 
 def get_lens_alias(template_file_path):
-    with open(template_file_path, 'r') as file:
-        template = yaml.full_load(file)    
-    lens_alias = lens.get_lens_alias(template['lens'])
-    return lens_alias
+    return lens.get_lens_alias(get_template_content(template_file_path).lens)
 
 def get_template_content(template_file_path):
-    with open(template_file_path, 'r') as file:
-        template = yaml.full_load(file)    
-    del template['lens']
-    return template
-
-
-def apply_marks_in_well_architected_tool(workload_id, template, lens_alias):
-    for pillar in template:
-        for question in template[pillar]:
-            if 'notes' in question:
-                notes = question['notes']
-            else:
-                notes = ''
-            if 'not_applicable' in question and question['not_applicable']:
-                well_architected_tool_client.update_answer(
-                    WorkloadId=workload_id,
-                    LensAlias=lens_alias,
-                    QuestionId=question['question_id'],
-                    IsApplicable=False,
-                    Notes=notes 
-                )                
-            else:
-                for answer in question['answers']:
-                    if 'status' in answer:
-                        update_answer(
-                            answer,
-                            workload_id,
-                            question_id=question['question_id'],
-                            notes=notes,
-                            lens_alias=lens_alias
-                        )
-
-def disable_standard_questions(workload_id, template):
-    for pillar in template:
-        for question in template[pillar]:
-            well_architected_tool_client.update_answer(
-                WorkloadId=workload_id,
-                LensAlias=conf.STANDARD_LENS_ALIAS,
-                QuestionId=question['question_id'],
-                IsApplicable=False,
-                Notes='' 
-            )                
-
-
-def update_answer(answer, workload_id, question_id, notes, lens_alias):
-    if answer_is_selected(answer):
-        status = {
-            answer['id']: {
-                'Status': answer['status']
-            }
+    return model.load_template(template_file_path)
+
+
+def apply_marks_in_well_architected_tool(workload_id, template, lens_alias, only_changes=False, concurrency=conf.DEFAULT_CONCURRENCY, run_journal=None):
+    planned_updates, sent_updates = mark_answers(workload_id, template, lens_alias, only_changes, concurrency, run_journal)
+    print(f"Answer updates planned: {planned_updates}, sent: {sent_updates}")
+
+def mark_answers(workload_id, template, lens_alias, only_changes=False, concurrency=conf.DEFAULT_CONCURRENCY, run_journal=None):
+    return send_planned_updates(workload_id, plan_answer_updates(template), lens_alias, only_changes, concurrency, run_journal)
+
+def send_planned_updates(workload_id, answer_updates, lens_alias, only_changes, concurrency, run_journal):
+    if run_journal:
+        answer_updates = run_journal.remaining_updates(lens_alias, answer_updates)
+    planned_updates = {answer_update['QuestionId']: answer_update for answer_update in answer_updates}
+    if only_changes:
+        answer_updates = delta.changed_answer_updates(workload_id, answer_updates, lens_alias, concurrency)
+        if run_journal:
+            changed_questions = {answer_update['QuestionId'] for answer_update in answer_updates}
+            for question_id, planned_update in planned_updates.items():
+                if question_id not in changed_questions:
+                    run_journal.record_answer(lens_alias, planned_update)
+    return len(answer_updates), send_answer_updates(workload_id, answer_updates, lens_alias, planned_updates, run_journal)
+
+def plan_answer_updates(template):
+    answer_updates = []
+    for question in template.questions():
+        answer_update = plan_question_update(question)
+        if answer_update:
+            answer_updates.append(answer_update)
+    return answer_updates
+
+def plan_question_update(question):
+    if question.not_applicable:
+        return {
+            'QuestionId': question.question_id,
+            'IsApplicable': False,
+            'Notes': question.notes
         }
-    else:
-        status = {
-            answer['id']: {
-                'Status': answer['status'],
-                'Reason': answer['reason'],
-                'Notes': answer['notes']
-            }
+    choice_updates = {}
+    for answer in question.answers:
+        if answer.status:
+            choice_updates[answer.id] = choice_update(answer)
+    if not choice_updates:
+        return None
+    return {
+        'QuestionId': question.question_id,
+        'IsApplicable': True,
+        'ChoiceUpdates': choice_updates,
+        'Notes': question.notes
+    }
+
+def choice_update(answer):
+    if not answer_is_not_applicable(answer):
+        return {
+            'Status': answer.status
         }
-    well_architected_tool_client.update_answer(
-        WorkloadId=workload_id,
-        LensAlias=lens_alias,
-        QuestionId=question_id,
-        ChoiceUpdates=status,
-        Notes=notes
-    )
-
-def answer_is_selected(answer):
-    return answer['status'] == 'SELECTED'
+    return {
+        'Status': answer.status,
+        'Reason': answer.reason,
+        'Notes': answer.notes
+    }
+
+def send_answer_updates(workload_id, answer_updates, lens_alias, planned_updates, run_journal=None):
+    sent_updates = 0
+    for answer_update in answer_updates:
+        client.get_client().update_answer(
+            WorkloadId=workload_id,
+            LensAlias=lens_alias,
+            **answer_update
+        )
+        if run_journal:
+            run_journal.record_answer(lens_alias, planned_updates[answer_update['QuestionId']])
+        sent_updates += 1
+    return sent_updates
+
+def disable_standard_questions(workload_id, template, only_changes=False, concurrency=conf.DEFAULT_CONCURRENCY, run_journal=None):
+    planned_updates, sent_updates = mark_standard_questions_not_applicable(workload_id, template, only_changes, concurrency, run_journal)
+    print(f"Standard lens updates planned: {planned_updates}, sent: {sent_updates}")
+
+def mark_standard_questions_not_applicable(workload_id, template, only_changes=False, concurrency=conf.DEFAULT_CONCURRENCY, run_journal=None):
+    return send_planned_updates(workload_id, plan_disable_updates(template), conf.STANDARD_LENS_ALIAS, only_changes, concurrency, run_journal)
+
+def plan_disable_updates(template):
+    answer_updates = []
+    for question in template.questions():
+        answer_updates.append({
+            'QuestionId': question.question_id,
+            'IsApplicable': False,
+            'Notes': ''
+        })
+    return answer_updates
+
+def answer_is_not_applicable(answer):
+    return answer.status == 'NOT_APPLICABLE'